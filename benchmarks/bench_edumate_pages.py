@@ -0,0 +1,74 @@
+"""
+CPU time spent decoding one ~5 MB page of Edumate carers. Compares the old get_all_parents path, which decoded every
+page three times, with decoding once using the standard json module and with the fast backend from utils/fast_json.py
+(orjson or msgspec, if installed).
+
+python -m benchmarks.bench_edumate_pages
+
+"""
+
+import json
+import time
+
+from utils import fast_json
+
+
+def make_page(target_size=5 * 1024 * 1024):
+    carers = []
+    i = 0
+    while True:
+        carers.append({
+            'general_info': {
+                'contact_id': i,
+                'firstname': 'Carer',
+                'surname': 'Number %s' % i,
+                'email_address': 'carer%s@example.com' % i,
+                'do_not_contact_flag': False,
+                'contact_reference': [{'contact_type': 'carer', 'carer_number': str(i)}],
+            },
+            'relationships': [{
+                'relationship_type': 'Child',
+                'mail_flag': True,
+                'contact_reference': [{'contact_type': 'student', 'student_number': str(100000 + i)}],
+            }],
+        })
+        i += 1
+        if i % 1000 == 0 and len(json.dumps(carers)) > target_size:
+            break
+    return json.dumps({'data': carers, 'pagination': {'next': 'https://example/next'}}).encode()
+
+
+def old_path(body):
+    json.loads(body)['data']  # get_parents
+    json.loads(body)['data']  # get_all_parents
+    json.loads(body)['pagination']['next']
+
+
+def once_with_json(body):
+    page = json.loads(body)
+    page['data'], page['pagination']['next']
+
+
+def once_with_fast_backend(body):
+    page = fast_json.json_loads(body)
+    page['data'], page['pagination']['next']
+
+
+def run(name, func, body, repeat=10):
+    start = time.process_time()
+    for _ in range(repeat):
+        func(body)
+    per_page = (time.process_time() - start) / repeat * 1000
+    print("%-28s %8.1f ms CPU per page" % (name, per_page))
+
+
+def main():
+    body = make_page()
+    print("Page size %.1f MB" % (len(body) / 1024 / 1024))
+    run('old (3 decodes, json)', old_path, body)
+    run('1 decode, json', once_with_json, body)
+    run('1 decode, %s' % fast_json.backend, once_with_fast_backend, body)
+
+
+if __name__ == '__main__':
+    main()
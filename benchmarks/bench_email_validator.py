@@ -0,0 +1,78 @@
+"""
+Time spent validating 50,000 realistic alumni addresses, a quarter of them repeated, and a set of adversarial inputs
+that are long and almost valid. Compares the regex the Edumate client used to have with edumate/email_validator.py.
+
+python -m benchmarks.bench_email_validator
+
+"""
+
+import random
+import re
+import time
+
+from edumate.email_validator import EmailValidator
+
+OLD_REGEX = re.compile(r"([-!#-'*+/-9=?A-Z^-~]+(\.[-!#-'*+/-9=?A-Z^-~]+)*|\"([]!#-[^-~ \t]|(\\[\t -~]))+\")@([-!#-'*+/-9=?A-Z^-~]+(\.[-!#-'*+/-9=?A-Z^-~]+)*|\[[\t -Z^-~]*])")
+
+
+def old_validate(emails):
+    valid = []
+    invalid = []
+    for email in emails:
+        if re.fullmatch(OLD_REGEX, email):
+            valid.append(email)
+        else:
+            invalid.append(email)
+    return valid, invalid
+
+
+def alumni_emails(count=50000):
+    random.seed(0)
+    domains = ['gmail.com', 'hotmail.com', 'outlook.com', 'bigpond.net.au', 'optusnet.com.au', 'school.edu.au']
+    emails = []
+    for i in range(count * 3 // 4):
+        email = 'first%s.last%s@%s' % (i, i % 97, random.choice(domains))
+        if i % 50 == 0:
+            email = email.replace('@', ' @')  # Some typos
+        emails.append(email)
+    emails += random.sample(emails, count - len(emails))
+    return emails
+
+
+def adversarial_emails(length=20000):
+    return [
+        'a' * length + '!',
+        'a.' * (length // 2) + '!',
+        '"' + 'a' * length,
+        '"' + '\\a' * (length // 2),
+        'x@' + 'a.' * (length // 2) + '!',
+        'x@' + 'a' * length + '\x00',
+        'x@[' + 'a' * length,
+        'first.last@' + 'sub.' * (length // 4) + 'com ',
+    ]
+
+
+def run(name, func, emails, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(emails)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print("%-30s %8.2f ms" % (name, elapsed))
+
+
+def main():
+    alumni = alumni_emails()
+    adversarial = adversarial_emails()
+    print("%s alumni addresses, %s adversarial addresses of ~20,000 characters" % (len(alumni), len(adversarial)))
+    run('alumni, old regex', old_validate, alumni)
+    run('alumni, validator (cold)', lambda emails: EmailValidator().validate(emails), alumni)
+    warm = EmailValidator()
+    warm.validate(alumni)
+    run('alumni, validator (warm)', warm.validate, alumni)
+    run('adversarial, old regex', old_validate, adversarial)
+    run('adversarial, validator', lambda emails: EmailValidator(max_length=10 ** 6).validate(emails), adversarial)
+    run('adversarial, validator (254)', lambda emails: EmailValidator().validate(emails), adversarial)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Compares the old nested loop bundle_contacts with ContactIndex on synthetic Engage data: 100k pupils, 60k families
+with two carers each, and siblings sharing carers.
+
+python -m benchmarks.bench_engage_index
+
+"""
+
+import random
+import time
+import tracemalloc
+
+from engage.contact_index import ContactIndex
+
+
+def make_data(pupil_count=100000, family_count=60000, seed=1):
+    random.seed(seed)
+    contacts = {}
+    for family in range(family_count):
+        for carer in (2 * family, 2 * family + 1):
+            contacts[carer] = [{
+                'external_id': '%s-carer%s@example.com' % (carer, carer),
+                'first_name': 'Carer',
+                'last_name': str(carer),
+                'email': 'carer%s@example.com' % carer,
+                'is_current_parent': True,
+                'data': {'engage_id': carer, 'is_parent': True},
+            }]
+    pupils = []
+    for pupil in range(pupil_count):
+        family = random.randrange(family_count)
+        pupils.append({
+            'pupilId': pupil,
+            'status': 'Current',
+            'yearGroup': str(random.randint(1, 12)),
+            'contacts': [{'contactId': 2 * family}, {'contactId': 2 * family + 1}],
+        })
+    return contacts, pupils
+
+
+def old_bundle(contacts, pupils):
+    final_contacts = []
+    for pupil in pupils:
+        year_group = pupil['yearGroup']
+        try:
+            student_contact_ids = [con['contactId'] for con in pupil['contacts']]
+        except KeyError:
+            continue
+        for student_contact_id in student_contact_ids:
+            for c in contacts[student_contact_id]:
+                try:
+                    c['data']['student_years'].append(year_group)
+                except KeyError:
+                    c['data'].update({'student_years': [year_group]})
+    for pupil in pupils:
+        try:
+            student_contact_ids = [con['contactId'] for con in pupil['contacts']]
+        except KeyError:
+            continue
+        for student_contact_id in student_contact_ids:
+            for c in contacts[student_contact_id]:
+                final_contacts.append(c)
+    return final_contacts
+
+
+def index_carers(contacts, pupils):
+    return list(ContactIndex(contacts, pupils).carers())
+
+
+def index_carer_years(contacts, pupils):
+    return list(ContactIndex(contacts, pupils).carer_years())
+
+
+def run(name, func):
+    contacts, pupils = make_data()
+    start = time.perf_counter()
+    result = func(contacts, pupils)
+    elapsed = time.perf_counter() - start
+    # Memory is measured on a separate run since tracemalloc slows everything down
+    contacts, pupils = make_data()
+    tracemalloc.start()
+    func(contacts, pupils)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("%-13s %7.3f s  peak %6.1f MB  %d records" % (name, elapsed, peak / 1024 / 1024, len(result)))
+
+
+def main():
+    run('nested loop', old_bundle)
+    run('carers', index_carers)
+    run('carer_years', index_carer_years)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Compares per-request latency of a bare requests.get (new connection every call, which is what the Edumate and TASS
+clients used to do) against the pooled keep-alive session from utils/session.py.
+
+It starts a small stub server on localhost so you don't need access to a school system. Over the internet with TLS
+the gap is a lot bigger since every new connection also pays for the round trips and the TLS handshake.
+The stub never sends 429, so the session's rate limiter never kicks in and this measures the connection pool alone.
+
+python -m benchmarks.bench_keepalive
+
+"""
+
+import socket
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from utils.session import build_session
+
+BODY = b'{"data": {"student": {"general_info": {"house": "Acacia"}}}}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Needed so the server keeps connections open
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes. Without this Nagle's algorithm holds the body back on a reused
+        # connection and you end up measuring delayed ACKs instead of the client
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def time_requests(get, url, count):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        get(url).content
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main(count=500):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:%s/contacts/contact-details/student/1' % server.server_address[1]
+    session = build_session()
+    try:
+        for name, get in [('requests.get', requests.get), ('pooled session', session.get)]:
+            get(url)  # Warm up
+            timings = time_requests(get, url, count)
+            print("%-15s mean %.3f ms  median %.3f ms  p95 %.3f ms" % (
+                name, statistics.mean(timings), statistics.median(timings),
+                statistics.quantiles(timings, n=20)[-1]))
+    finally:
+        session.close()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Memory held by 20,000 records kept as decoded dicts versus the compact models in edumate_models.py,
+sentral_models.py and engage_models.py. Also shows how long the conversion takes, which you pay on top of the JSON
+decode.
+
+python -m benchmarks.bench_models
+
+"""
+
+import gc
+import json
+import time
+import tracemalloc
+
+from edumate.edumate_models import EdumateContact
+from engage.engage_models import EngageContact
+from sentral.sentral_models import decode_resource
+
+COUNT = 20000
+
+
+def edumate_carer(i):
+    return {
+        'general_info': {
+            'contact_id': i,
+            'firstname': 'Carer',
+            'surname': 'Number %s' % i,
+            'email_address': 'carer%s@example.com' % i,
+            'do_not_contact_flag': False,
+            'contact_reference': [{'contact_type': 'carer', 'carer_number': str(i)}],
+        },
+        'relationships': [{
+            'relationship_type': 'Child',
+            'mail_flag': True,
+            'contact_reference': [{'contact_type': 'student', 'student_number': str(100000 + i)}],
+        }],
+    }
+
+
+def sentral_person(i):
+    return {
+        'type': 'person',
+        'id': str(i),
+        'attributes': {
+            'firstName': 'Person', 'lastName': 'Number %s' % i, 'preferredName': None, 'gender': 'F',
+            'dateOfBirth': '2010-01-01T00:00:00+10:00', 'legalFirstName': 'Person', 'legalLastName': 'Number %s' % i,
+            'middleNames': '', 'title': 'Ms', 'isDeceased': False,
+        },
+        'relationships': {
+            'primaryHousehold': {'data': {'type': 'household', 'id': str(i // 2)},
+                                 'links': {'related': 'https://example/household/%s' % (i // 2)}},
+            'student': {'data': {'type': 'student', 'id': str(i)},
+                        'links': {'related': 'https://example/student/%s' % i}},
+        },
+        'links': {'self': 'https://example/person/%s' % i},
+    }
+
+
+def engage_contact(i):
+    contact = {'contactId': i, 'forename': 'Carer', 'surname': 'Number %s' % i, 'greeting': 'Dear Carer',
+               'title': 'Mrs'}
+    email = {'contactId': i, 'emailAddress': 'carer%s@example.com' % i, 'description': 'Home', 'isPrimary': True}
+    return contact, email
+
+
+def measure(build):
+    """
+    Returns (bytes held by the result, seconds to build it)
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.process_time()
+    result = build()
+    elapsed = time.process_time() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def compare(name, as_dicts, as_models):
+    dict_size, dict_time = measure(as_dicts)
+    model_size, model_time = measure(as_models)
+    print("%-8s dicts %6.1f MB  models %6.1f MB  (%.0f%% less)  decode %5.0f ms vs %5.0f ms" % (
+        name, dict_size / 1e6, model_size / 1e6, 100 - model_size * 100 / dict_size, dict_time * 1000,
+        model_time * 1000))
+
+
+def main():
+    edumate = json.dumps([edumate_carer(i) for i in range(COUNT)])
+    compare('edumate', lambda: json.loads(edumate),
+            lambda: [EdumateContact.from_dict(c) for c in json.loads(edumate)])
+
+    sentral = json.dumps([sentral_person(i) for i in range(COUNT)])
+    compare('sentral', lambda: json.loads(sentral),
+            lambda: [decode_resource(r) for r in json.loads(sentral)])
+
+    engage = json.dumps([engage_contact(i) for i in range(COUNT)])
+    compare('engage', lambda: [EngageContact.from_api(c, e).to_dict() for c, e in json.loads(engage)],
+            lambda: [EngageContact.from_api(c, e) for c, e in json.loads(engage)])
+
+
+if __name__ == '__main__':
+    main()
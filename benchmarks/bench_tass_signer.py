@@ -0,0 +1,70 @@
+"""
+Measures how many TASS URLs per second we can generate, e.g. for get_student_timetable across a whole school.
+
+Compares the old approach (decode the key and build a new AES cipher for every URL) with TassRequestSigner, for both
+unique parameter strings and repeated ones that hit the cache.
+
+python -m benchmarks.bench_tass_signer
+
+"""
+
+import base64
+import os
+import time
+from urllib.parse import urlencode
+from Crypto.Cipher import AES
+
+from tass.tass_signer import TassSigningMixin
+
+TOKEN_KEY = base64.b64encode(os.urandom(16)).decode()
+
+
+def old_encrypted_token(token, params):
+    decoded = base64.b64decode(token)
+    plaintext = params
+    length = 16 - (len(plaintext) % 16)
+    plaintext += chr(length) * length
+    rijndael = AES.new(decoded, AES.MODE_ECB)
+    ciphertext = rijndael.encrypt(plaintext.encode("utf8"))
+    return base64.b64encode(ciphertext)
+
+
+def old_url(params):
+    request_dict = {
+        "method": 'getStudentTimetable',
+        "appcode": 'APP',
+        "company": '10',
+        "v": '3',
+        "token": old_encrypted_token(TOKEN_KEY, params),
+    }
+    return 'https://tass.example.edu.au/tassweb/api/?' + urlencode(request_dict)
+
+
+class Client(TassSigningMixin):
+    token_key = TOKEN_KEY
+    app_code = 'APP'
+    company_code = '10'
+    end_point = 'https://tass.example.edu.au/tassweb/api/'
+
+
+def run(name, make_url, params_list):
+    start = time.perf_counter()
+    for params in params_list:
+        make_url(params)
+    elapsed = time.perf_counter() - start
+    print("%-25s %10.0f URLs/sec" % (name, len(params_list) / elapsed))
+
+
+def main(count=50000):
+    unique = ["{'student_code': '%s'}" % i for i in range(count)]
+    repeated = ["{'student_code': '%s'}" % (i % 100) for i in range(count)]
+    client = Client()
+    assert client.get_url(unique[0], 'getStudentTimetable', '3') == old_url(unique[0])
+    run('old, unique params', old_url, unique)
+    run('signer, unique params', lambda p: client.get_url(p, 'getStudentTimetable', '3'), unique)
+    run('old, repeated params', old_url, repeated)
+    run('signer, repeated params', lambda p: client.get_url(p, 'getStudentTimetable', '3'), repeated)
+
+
+if __name__ == '__main__':
+    main()
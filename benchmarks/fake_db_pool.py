@@ -0,0 +1,177 @@
+"""
+Runs ConnectionPool against a fake DB-API driver so you can check the reconnect paths without a SQL Server. The fake
+driver hands out in-memory sqlite3 connections, and restarting the fake server kills every connection it has handed
+out so far, like a SQL Server failover or a dropped VPN would.
+
+python -m benchmarks.fake_db_pool
+
+"""
+
+import sqlite3
+import threading
+import time
+
+from mssql_client.connection_pool import ConnectionPool
+
+
+class OperationalError(Exception):
+    pass
+
+
+class FakeServer(object):
+
+    def __init__(self):
+        self.generation = 0
+        self.connects = 0
+        self.executes = 0
+        self.open = 0
+        self.max_open = 0
+        self.lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            self.connects += 1
+            self.open += 1
+            self.max_open = max(self.max_open, self.open)
+        return FakeConnection(self)
+
+    def restart(self):
+        """
+        Every connection handed out so far is dead after this
+        """
+        self.generation += 1
+
+
+class FakeConnection(object):
+
+    def __init__(self, server):
+        self.server = server
+        self.generation = server.generation
+        self.closed = False
+        self.db = sqlite3.connect(':memory:', check_same_thread=False)
+
+    def check(self):
+        if self.closed or self.generation != self.server.generation:
+            raise OperationalError("Connection to the server was lost")
+
+    def cursor(self):
+        self.check()
+        return FakeCursor(self)
+
+    def rollback(self):
+        self.check()
+        self.db.rollback()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.db.close()
+            with self.server.lock:
+                self.server.open -= 1
+
+
+class FakeCursor(object):
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.db.cursor()
+
+    def execute(self, sql, params=()):
+        self.conn.check()
+        with self.conn.server.lock:
+            self.conn.server.executes += 1
+        self.cursor.execute(sql, params)
+
+    def fetchall(self):
+        self.conn.check()
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+def select(value):
+    def run(conn):
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT ?', (value,))
+            return cursor.fetchall()[0][0]
+        finally:
+            cursor.close()
+    return run
+
+
+def check_idle_health_check():
+    server = FakeServer()
+    pool = ConnectionPool(server.connect, size=2, check_after=0)
+    assert pool.run(select(1)) == 1
+    server.restart()
+    # The idle connection fails its health check when it's handed out again and gets replaced
+    assert pool.run(select(2)) == 2
+    assert server.connects == 2, server.connects
+    pool.close()
+    print("idle health check: dead connection replaced, %s connects" % server.connects)
+
+
+def check_retry_on_dead_connection():
+    server = FakeServer()
+    pool = ConnectionPool(server.connect, size=2, check_after=3600)
+    assert pool.run(select(1)) == 1
+    server.restart()
+    # Too recently used to be health checked, so the query itself fails and run retries on a fresh connection
+    assert pool.run(select(2)) == 2
+    assert server.connects == 2, server.connects
+    pool.close()
+    print("dead connection mid query: retried on a fresh connection, %s connects" % server.connects)
+
+
+def check_no_retry_on_bad_sql():
+    server = FakeServer()
+    pool = ConnectionPool(server.connect, size=2)
+
+    def bad_sql(conn):
+        conn.cursor().execute('SELEC 1')
+
+    try:
+        pool.run(bad_sql)
+    except sqlite3.OperationalError:
+        pass
+    else:
+        raise AssertionError("Bad SQL should have been raised")
+    # One execute for the query and one for the health check that decided not to retry
+    assert server.executes == 2 and server.connects == 1, (server.executes, server.connects)
+    pool.close()
+    print("bad SQL on a healthy connection: raised without a retry")
+
+
+def check_size_limit(threads=8, calls=50):
+    server = FakeServer()
+    pool = ConnectionPool(server.connect, size=2)
+
+    def slow(conn):
+        time.sleep(0.001)
+        return select(1)(conn)
+
+    def work():
+        for _ in range(calls):
+            pool.run(slow)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert server.max_open <= pool.size, server.max_open
+    pool.close()
+    print("%s threads on a pool of %s: at most %s connections open" % (threads, pool.size, server.max_open))
+
+
+def main():
+    check_idle_health_check()
+    check_retry_on_dead_connection()
+    check_no_retry_on_bad_sql()
+    check_size_limit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Runs EnrolmentImporter with a real PCSchoolClient against a fake PCSchool ImportHandler and PollHandler on localhost,
+so you can check the submit and poll backoff paths without a PCSchool server.
+
+Each fake import job reports Queued for a few polls, then Processing, then Complete. The handler records when every
+poll came in, and we check the gap between polls grows while the status stays the same and drops back to first_poll
+when it changes. One application is rejected by the ImportHandler and one job fails, to check both end up as errors.
+
+python -m benchmarks.fake_pcschool_import
+
+"""
+
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pcschool.pcschool_client import PCSchoolClient
+from pcschool.pcschool_import import EnrolmentImporter, EnrolmentImportError
+from utils.transport import ResilientAdapter
+
+STATUSES = ['Queued'] * 5 + ['Processing'] * 3 + ['Complete']
+FAILED_STATUSES = ['Queued'] * 2 + ['Failed']
+
+
+class FakePCSchool(object):
+
+    def __init__(self):
+        self.job_ids = itertools.count(1)
+        self.jobs = {}  # job id -> list of statuses to report, one per poll
+        self.polls = {}  # job id -> list of (time, status)
+        self.lock = threading.Lock()
+
+    def import_handler(self, payload):
+        if not payload.get('StudentSurname'):
+            return 400, {'Message': 'StudentSurname is required'}
+        with self.lock:
+            job_id = next(self.job_ids)
+            self.jobs[job_id] = list(FAILED_STATUSES if payload.get('fail') else STATUSES)
+            self.polls[job_id] = []
+        return 200, {EnrolmentImporter.job_id_key: job_id}
+
+    def poll_handler(self, payload):
+        job_id = payload.get(EnrolmentImporter.job_id_key)
+        with self.lock:
+            statuses = self.jobs.get(job_id)
+            if statuses is None:
+                return 404, {'Message': 'No job %s' % job_id}
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+            self.polls[job_id].append((time.monotonic(), status))
+        return 200, {EnrolmentImporter.job_id_key: job_id, EnrolmentImporter.status_key: status}
+
+
+def make_handler(fake):
+
+    class FakeHandler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            if 'ts' not in payload or 'hmac' not in payload:
+                status, body = 401, {'Message': 'Request is not signed'}
+            elif self.path.endswith('/ImportHandler'):
+                status, body = fake.import_handler(payload)
+            elif self.path.endswith('/PollHandler'):
+                status, body = fake.poll_handler(payload)
+            else:
+                status, body = 404, {'Message': 'Unknown handler'}
+            body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return FakeHandler
+
+
+def check_backoff(polls, first_poll, backoff, max_poll):
+    """
+    Compares the gaps between a job's polls with the delays the importer should have used, allowing for the +-20%
+    jitter and a bit of scheduling noise
+    """
+    delay = first_poll
+    last_status = None
+    gaps = []
+    for (previous, status), (now, _) in zip(polls, polls[1:]):
+        if status == last_status:
+            delay = min(delay * backoff, max_poll)
+        else:
+            delay = first_poll
+        last_status = status
+        gap = now - previous
+        assert delay * 0.8 - 0.01 <= gap <= delay * 1.2 + 0.05, (status, delay, gap)
+        gaps.append(gap)
+    return gaps
+
+
+def main(first_poll=0.05, backoff=2, max_poll=0.3):
+    fake = FakePCSchool()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(fake))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = PCSchoolClient(base_url='http://127.0.0.1:%s' % server.server_address[1], username='user',
+                            password='password', private_key='private', api_key='api')
+    # Don't let the default rate limit get in the way of the poll timings
+    client.session.mount('http://', ResilientAdapter(rate=1000, max_rate=1000))
+    importer = EnrolmentImporter(client, max_workers=4, first_poll=first_poll, max_poll=max_poll, backoff=backoff,
+                                 timeout=30)
+    applications = [{'StudentSurname': 'Student %s' % i} for i in range(4)]
+    applications += [{'StudentSurname': ''}, {'StudentSurname': 'Failing', 'fail': True}]
+    try:
+        results = {}
+        for application, result, error in importer.run(applications):
+            results[application['StudentSurname']] = (result, error)
+    finally:
+        client.close()
+        server.shutdown()
+
+    for i in range(4):
+        result, error = results['Student %s' % i]
+        assert error is None and result[EnrolmentImporter.status_key] == 'Complete', (result, error)
+    assert isinstance(results[''][1], EnrolmentImportError), results['']
+    assert isinstance(results['Failing'][1], EnrolmentImportError), results['Failing']
+    print("%s imported, rejected and failed jobs raised EnrolmentImportError" % sum(
+        1 for result, error in results.values() if error is None))
+
+    for job_id, polls in sorted(fake.polls.items()):
+        gaps = check_backoff(polls, first_poll, backoff, max_poll)
+        print("job %s: %s" % (job_id, ', '.join('%s %.2fs' % (status, gap) for (_, status), gap in zip(polls, gaps))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Runs a session from utils/session.py against a stub server on localhost to check how ResilientAdapter rate limits and
+retries without hitting a school system.
+
+- A server that never throttles gets requests as fast as we make them.
+- A 429 with a Retry-After longer than max_retry_after is handed straight back and doesn't freeze the tenant.
+- A 429 with a short Retry-After is waited out and retried.
+
+python -m benchmarks.fake_transport
+
+"""
+
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.session import build_session
+
+BODY = b'{"data": []}'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    throttles = {}  # path -> Retry-After to send on the first request
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        # Stops Nagle's algorithm holding the body back on a reused connection, see bench_keepalive.py
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_GET(self):
+        with self.lock:
+            retry_after = self.throttles.pop(self.path, None)
+        if retry_after is not None:
+            self.send_response(429)
+            self.send_header('Retry-After', str(retry_after))
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def check_unthrottled(session, url, count=500):
+    start = time.monotonic()
+    for _ in range(count):
+        session.get(url).content
+    elapsed = time.monotonic() - start
+    # Before the first throttle the limiter shouldn't be what sets the pace
+    assert elapsed < count / 100.0, elapsed
+    print("%s requests to a server that never throttles took %.2f s" % (count, elapsed))
+
+
+def check_long_retry_after(session, base_url):
+    StubHandler.throttles['/long'] = 3600
+    start = time.monotonic()
+    response = session.get(base_url + '/long')
+    assert response.status_code == 429, response.status_code
+    response = session.get(base_url + '/after-long')
+    elapsed = time.monotonic() - start
+    assert response.status_code == 200 and elapsed < 1, (response.status_code, elapsed)
+    print("429 with Retry-After: 3600 handed back and the next request went out after %.3f s" % elapsed)
+
+
+def check_short_retry_after(session, base_url):
+    StubHandler.throttles['/short'] = 1
+    start = time.monotonic()
+    response = session.get(base_url + '/short')
+    elapsed = time.monotonic() - start
+    assert response.status_code == 200 and 1 <= elapsed < 3, (response.status_code, elapsed)
+    print("429 with Retry-After: 1 waited out and retried in %.2f s" % elapsed)
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = 'http://127.0.0.1:%s' % server.server_address[1]
+    try:
+        with build_session() as session:
+            check_unthrottled(session, base_url + '/fast')
+        with build_session() as session:
+            check_long_retry_after(session, base_url)
+        with build_session() as session:
+            check_short_retry_after(session, base_url)
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
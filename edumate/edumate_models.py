@@ -0,0 +1,79 @@
+"""
+Compact versions of the Edumate contact records. Only the fields the client uses are kept, in __slots__ classes instead
+of nested dicts, and repeated strings like relationship types are interned. Handy when you need to hold a whole school
+in memory, e.g. for reconciliation:
+
+contacts = [EdumateContact.from_dict(con) for con in client.paginate(client.current_parent_url)]
+
+Run benchmarks/bench_models.py to see the difference for your data. On 20,000 synthetic carers the models took 11 MB
+against 35 MB for the decoded dicts. Building them costs extra CPU on top of the JSON decode, so only bother when memory
+is the problem.
+
+"""
+
+import sys
+
+
+class EdumateRelationship(object):
+    __slots__ = ('relationship_type', 'mail_flag', 'contact_types', 'student_numbers')
+
+    def __init__(self, relationship_type, mail_flag, contact_types, student_numbers):
+        self.relationship_type = relationship_type
+        self.mail_flag = mail_flag
+        self.contact_types = contact_types
+        self.student_numbers = student_numbers
+
+    @classmethod
+    def from_dict(cls, relationship):
+        refs = relationship['contact_reference']
+        return cls(
+            sys.intern(relationship['relationship_type'].upper()),
+            relationship['mail_flag'],
+            tuple(sys.intern(ref['contact_type']) for ref in refs),
+            tuple(ref['student_number'] for ref in refs if ref.get('student_number')),
+        )
+
+
+class EdumateContact(object):
+    __slots__ = ('firstname', 'surname', 'email_address', 'do_not_contact_flag', 'staff_number', 'student_number',
+                 'relationships')
+
+    def __init__(self, firstname, surname, email_address, do_not_contact_flag, staff_number, student_number,
+                 relationships):
+        self.firstname = firstname
+        self.surname = surname
+        self.email_address = email_address
+        self.do_not_contact_flag = do_not_contact_flag
+        self.staff_number = staff_number
+        self.student_number = student_number
+        self.relationships = relationships
+
+    @classmethod
+    def from_dict(cls, con):
+        """
+        :param con: A contact dict from any of the Edumate contact lists
+        """
+        general_info = con['general_info']
+        staff_number = student_number = None
+        for ref in general_info.get('contact_reference', []):
+            staff_number = ref.get('staff_number') or staff_number
+            student_number = ref.get('student_number') or student_number
+        return cls(
+            general_info['firstname'],
+            general_info['surname'],
+            general_info['email_address'],
+            general_info['do_not_contact_flag'],
+            staff_number,
+            student_number,
+            tuple(EdumateRelationship.from_dict(r) for r in con.get('relationships', [])),
+        )
+
+    def student_ids(self, carer_relationships):
+        """
+        Same as EdumateClient.get_student_ids but for a compact contact
+        """
+        student_ids = []
+        for relationship in self.relationships:
+            if relationship.relationship_type in carer_relationships:
+                student_ids.extend(relationship.student_numbers)
+        return student_ids
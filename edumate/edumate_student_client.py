@@ -10,6 +10,21 @@ client.get_all_parents()
 client.get_more_student_details()
 client.get_all_past_students()
 
+When you need the detailed view for lots of students or staff use fetch_details. It keeps a few requests in flight at
+once and gives you results as they come back:
+
+for student_number, data, error in client.fetch_details(['12345', '12346'], contact_type='student'):
+    print(student_number, data or error)
+
+The get_all_* methods walk every page of a list. Set page_prefetch on the client to have the next pages fetched in the
+background while you're processing the current one. Pages are decoded with orjson if you have it installed, which
+makes a big difference on large pages.
+
+If you need to keep a whole list in memory use iter_contacts. It gives you compact EdumateContact objects instead of
+the full dicts:
+
+carers = list(client.iter_contacts(client.current_parent_url))
+
 You need to install Python requests to use this client. Done with:
 
 pip install requests
@@ -17,29 +32,38 @@ pip install requests
 Edumate API docs can be found here https://integrations.edumate.net/apidoc/
 
 """
-import requests
-import re
 
-regex = re.compile(r"([-!#-'*+/-9=?A-Z^-~]+(\.[-!#-'*+/-9=?A-Z^-~]+)*|\"([]!#-[^-~ \t]|(\\[\t -~]))+\")@([-!#-'*+/-9=?A-Z^-~]+(\.[-!#-'*+/-9=?A-Z^-~]+)*|\[[\t -Z^-~]*])")
+from edumate.edumate_models import EdumateContact
+from edumate.email_validator import default_validator
+from utils.async_clients import AsyncClient
+from utils.concurrency import bounded_as_completed
+from utils.fast_json import json_loads
+from utils.paginator import Paginator
+from utils.session import SessionMixin, build_session
+
 
 def is_email_valid(email):
     """
-    This is basic email validation. You should probably use a more robust email validation package
+    This is basic email validation. See email_validator.py, use validate_emails there to check lots of addresses at once
+    and find out why they failed
     :param email: Email string
     :return: True or False
     """
-    if re.fullmatch(regex, email):
-        return True
-    return False
+    return default_validator.is_valid(email)
+
 
 class EdumateClientError(Exception):
     pass
 
 
-class EdumateClient(object):
+class EdumateClient(SessionMixin):
 
-    def __init__(self):
-        self.edumate_url = 'https://edumate.yourschooldomain.edu.au/school/web/app.php/api/'
+    def __init__(self, edumate_url='https://edumate.yourschooldomain.edu.au/school/web/app.php/api/',
+                 client_id='edumate_client_id', client_secret='edumate_client_secret'):
+        """
+        The defaults are placeholders. Pass your own when you sync more than one school from the same process
+        """
+        self.edumate_url = edumate_url
         self.auth_url = self.edumate_url + 'authorize'
         self.current_parent_url = self.edumate_url + 'contacts/contacts/current?contactType=carer'
         self.current_student_url = self.edumate_url + 'contacts/contacts/current?contactType=student'
@@ -48,15 +72,17 @@ class EdumateClient(object):
         self.staff_list_url = self.edumate_url + 'contacts/contacts/current?contactType=staff'
         self.staff_detail_url = self.edumate_url + 'contacts/contact-details/staff/'
         self.student_lms_url = self.edumate_url + 'lms/students'
-        self.client_id = 'edumate_client_id'  # Get this from Edumate Admin section
-        self.client_secret = 'edumate_client_secret' # Get this from Edumate Admin section
+        self.client_id = client_id  # Get this from Edumate Admin section
+        self.client_secret = client_secret  # Get this from Edumate Admin section
+        self.session = build_session()
         self.access_token = self.authenticate()
         self.headers = {'Authorization': 'Bearer %s' % self.access_token}
+        self.page_prefetch = 0  # How many pages the get_all_* methods fetch ahead in the background
         self.CARER_RELATIONSHIPS = ['CHILD', 'STEP CHILD', 'FOSTER CHILD', 'STEPCHILD', 'FOSTER CHILD', 'CHARGE']  # You
         # need to use whatever defines a carer at your school. This would be per school thing
 
     def authenticate(self):
-        resp = requests.post(self.auth_url, data={'client_id': self.client_id, 'client_secret': self.client_secret})
+        resp = self.session.post(self.auth_url, data={'client_id': self.client_id, 'client_secret': self.client_secret})
         if resp.ok:
             return resp.json()['data']['access_token']
         raise EdumateClientError("Failed to authenticate with Edumate for %s. Error: %s" % resp.text)
@@ -92,62 +118,117 @@ class EdumateClient(object):
                             return True
         return False
 
-    def get_parents(self, url=None):
-        if not url:
-            url = self.current_parent_url
-        resp = requests.get(url, headers=self.headers)
+    def get_page(self, url):
+        """
+        Fetches one page of an Edumate list and decodes it. This is the only place a page gets decoded.
+        """
+        resp = self.session.get(url, headers=self.headers)
+        if not resp.ok:
+            raise EdumateClientError("Failed to get %s from Edumate. Error: %s" % (url, resp.text))
+        return json_loads(resp.content)
+
+    def process_page(self, url, process):
+        """
+        Fetches one page and hands its records to process. Used by the single page get_* methods, which return the
+        requests Response like they always have.
+        """
+        resp = self.session.get(url, headers=self.headers)
         if resp.ok:
-            data = resp.json()['data']
-            for con in data:
-                if not con['general_info']['email_address']:
-                    continue
-                if con['general_info']['do_not_contact_flag']:
-                    continue
-                if self.should_import(con):
-                    self.store_parent(con)
-                    pass
-                else:
-                    print("should not import %s" % con['general_info']['email_address'])
+            process(json_loads(resp.content)['data'])
+        return resp
 
-        else:
-            raise EdumateClientError("Failed to get parents from Edumate for %s. Error: %s" % resp.text)
+    def paginate(self, url, prefetch=None):
+        """
+        Returns a Paginator over an Edumate list. Iterate over it for records or call pages() for whole pages. The
+        paginator stops on the first page without a next link.
+        :param url: URL of the first page
+        :param prefetch: How many pages to fetch ahead. Defaults to self.page_prefetch
+        """
+        if prefetch is None:
+            prefetch = self.page_prefetch
+        return Paginator(self.get_page, url, next_url=lambda page: page.get('pagination', {}).get('next'),
+                         prefetch=prefetch)
+
+    def iter_pages(self, url, prefetch=None):
+        """
+        Yields every decoded page of an Edumate list in order. See paginate.
+        """
+        yield from self.paginate(url, prefetch).pages()
+
+    def iter_contacts(self, url, prefetch=None):
+        """
+        Yields every contact in an Edumate contact list as a compact EdumateContact. See edumate/edumate_models.py
+        """
+        for con in self.paginate(url, prefetch):
+            yield EdumateContact.from_dict(con)
+
+    def process_parents(self, data):
+        for con in data:
+            if not con['general_info']['email_address']:
+                continue
+            if con['general_info']['do_not_contact_flag']:
+                continue
+            if self.should_import(con):
+                self.store_parent(con)
+                pass
+            else:
+                print("should not import %s" % con['general_info']['email_address'])
+
+    def get_parents(self, url=None):
+        url = url or self.current_parent_url
+        resp = self.process_page(url, self.process_parents)
+        if not resp.ok:
+            raise EdumateClientError("Failed to get parents from Edumate for %s. Error: %s" % (url, resp.text))
         return resp
 
-    def get_all_parents(self):
+    def get_all_parents(self, prefetch=None):
         all_parents_list = []
-        resp = self.get_parents()
-        if resp.ok:
-            all_parents_list += resp.json()['data']
-            next_url = resp.json()['pagination']['next']
-            while next_url:
-                resp = self.get_parents(url=next_url)
-                all_parents_list += resp.json()['data']
-                try:
-                    next_url = resp.json()['pagination']['next']
-                except KeyError:
-                    # We'll get here once we reach the end of pagination and the response doesn't contain next page
-                    return all_parents_list
+        for page in self.paginate(self.current_parent_url, prefetch).pages():
+            self.process_parents(page['data'])
+            all_parents_list += page['data']
+        return all_parents_list
+
+    def process_students(self, data):
+        for student in data:
+            pass  # This is where you loop over the list and process data
 
     def get_students(self, url=None):
-        if not url:
-            url = self.student_lms_url
-        resp = requests.get(url, headers=self.headers)
-        if resp.ok:
-            data = resp.json()['data']
-            # This is where you loop over the list and process data
-        return resp
+        return self.process_page(url or self.student_lms_url, self.process_students)
 
-    def get_all_students(self):
-        resp = self.get_students()
-        if resp.ok:
-            next_url = resp.json()['pagination']['next']
-            while next_url:
-                resp = self.get_students(url=next_url)
-                try:
-                    next_url = resp.json()['pagination']['next']
-                except KeyError:
-                    # We'll get here once we reach the end of pagination and the response doesn't contain next page
-                    return
+    def get_all_students(self, prefetch=None):
+        for page in self.paginate(self.student_lms_url, prefetch).pages():
+            self.process_students(page['data'])
+
+    def get_detail(self, url, timeout=30):
+        """
+        Fetches one contact-details record. Connection errors, timeouts and 502/503/504 responses are already retried
+        by the session's transport, see utils/transport.py.
+        :return: The 'data' dict from the response
+        """
+        resp = self.session.get(url, headers=self.headers, timeout=timeout)
+        if not resp.ok:
+            raise EdumateClientError("Failed to get %s from Edumate. Error: %s" % (url, resp.text))
+        return resp.json()['data']
+
+    def fetch_details(self, numbers, contact_type='student', max_workers=8, timeout=30):
+        """
+        Fetches the detailed view for a bunch of students or staff with up to max_workers requests in flight at once.
+        A slow or failing lookup only holds up its own worker, the rest of the batch keeps going.
+        :param numbers: Iterable of student or staff numbers
+        :param contact_type: 'student' or 'staff'
+        :param max_workers: How many requests to keep in flight
+        :param timeout: Seconds to wait for each request
+        :return: Generator of (number, data, error) tuples in the order they come back. error is None on success
+        """
+        if contact_type == 'staff':
+            base_url = self.staff_detail_url
+        else:
+            base_url = self.detailed_student_url
+
+        def fetch(number):
+            return self.get_detail(base_url + number, timeout=timeout)
+
+        yield from bounded_as_completed(fetch, numbers, max_workers=max_workers)
 
     def get_more_student_details(self):
         """
@@ -155,37 +236,41 @@ class EdumateClient(object):
         to fetch more info.
         """
         students = []  # This is a list of students which you've fetched from the list view
+        students_by_number = {}
         for student in students:
             sid = student.data.get('student_number')
             if sid:
-                url = self.detailed_student_url + sid
-                resp = requests.get(url, headers=self.headers)
-                if resp.ok:
-                    data = resp.json()['data']['student']
-                    if data['enrolment'].get('short_form_run'):
-                        academic_year = data['enrolment'].get('short_form_run')
-                    elif "Kindergarten" in data['enrolment'].get('current_form_run'):
-                        academic_year = 'K'
-                    elif "Year" in data['enrolment'].get('current_form_run'):
-                        academic_year = data['enrolment'].get('current_form_run').split('Year')[1].strip()
-                    else:
-                        academic_year = 'Prep'
-                    if academic_year:
-                        student.data.update({'academic_year': academic_year})
-                    if data['general_info']['student_status'] == 'Current Enrolment':
-                        student.current = True
-                    student.data.update(
-                        {'current_form_run': data['enrolment']['current_form_run'],
-                         'tutor_roll_class': data['enrolment']['tutor_roll_class'],
-                         'tutor_roll_class_code': data['enrolment']['tutor_roll_class_code'],
-                         'tutor_teacher': data['enrolment']['tutor_teacher'],
-                         'house': data['general_info']['house'],
-                         'student_status': data['general_info']['student_status'],
-                         'student_type': data['general_info']['student_type'],
-                         }
-                    )
-                    student.current = True
-                    student.save()  # I have a save method my student object here but you can do whatever with this data
+                students_by_number[sid] = student
+        for sid, data, error in self.fetch_details(students_by_number, contact_type='student'):
+            if error:
+                print("Failed to get details for student %s. Error: %s" % (sid, error))
+                continue
+            student = students_by_number[sid]
+            data = data['student']
+            if data['enrolment'].get('short_form_run'):
+                academic_year = data['enrolment'].get('short_form_run')
+            elif "Kindergarten" in data['enrolment'].get('current_form_run'):
+                academic_year = 'K'
+            elif "Year" in data['enrolment'].get('current_form_run'):
+                academic_year = data['enrolment'].get('current_form_run').split('Year')[1].strip()
+            else:
+                academic_year = 'Prep'
+            if academic_year:
+                student.data.update({'academic_year': academic_year})
+            if data['general_info']['student_status'] == 'Current Enrolment':
+                student.current = True
+            student.data.update(
+                {'current_form_run': data['enrolment']['current_form_run'],
+                 'tutor_roll_class': data['enrolment']['tutor_roll_class'],
+                 'tutor_roll_class_code': data['enrolment']['tutor_roll_class_code'],
+                 'tutor_teacher': data['enrolment']['tutor_teacher'],
+                 'house': data['general_info']['house'],
+                 'student_status': data['general_info']['student_status'],
+                 'student_type': data['general_info']['student_type'],
+                 }
+            )
+            student.current = True
+            student.save()  # I have a save method my student object here but you can do whatever with this data
 
     def is_staff_also_parent(self, con):
         """
@@ -198,34 +283,24 @@ class EdumateClient(object):
                 return True
         return False
 
+    def process_current_staff(self, data):
+        for con in data:
+            if not con['general_info']['email_address']:
+                continue
+            staff_number = ''
+            for ref in con['general_info']['contact_reference']:
+                if ref.get('staff_number'):
+                    staff_number = ref.get('staff_number')
+            if self.is_staff_also_parent(con):
+                # This staff member is also a parent
+                self.store_parent(con)
+
     def get_current_staff(self, url=None):
-        if not url:
-            url = self.staff_list_url
-        resp = requests.get(url, headers=self.headers)
-        if resp.ok:
-            data = resp.json()['data']
-            for con in data:
-                if not con['general_info']['email_address']:
-                    continue
-                staff_number = ''
-                for ref in con['general_info']['contact_reference']:
-                    if ref.get('staff_number'):
-                        staff_number = ref.get('staff_number')
-                if self.is_staff_also_parent(con):
-                    # This staff member is also a parent
-                    self.store_parent(con)
-        return resp
+        return self.process_page(url or self.staff_list_url, self.process_current_staff)
 
-    def get_all_current_staff(self):
-        resp = self.get_current_staff()
-        if resp.ok:
-            next_url = resp.json()['pagination']['next']
-            while next_url:
-                resp = self.get_current_staff(url=next_url)
-                try:
-                    next_url = resp.json()['pagination']['next']
-                except KeyError:
-                    return
+    def get_all_current_staff(self, prefetch=None):
+        for page in self.paginate(self.staff_list_url, prefetch).pages():
+            self.process_current_staff(page['data'])
 
     def get_staff_detail(self):
         """
@@ -233,40 +308,40 @@ class EdumateClient(object):
         :return:
         """
         staff = []  # This will be a list of staff members
-        for s in staff:
-            resp = requests.get(self.staff_detail_url + s.data.get('staff_number'), headers=self.headers)
-            if resp.ok:
-                data = resp.json()['data']
-                staff_type = data['staff']['employment']['staff_type']
-                s.data.update({'staff_type': staff_type})
-                s.save()
+        staff_by_number = {s.data.get('staff_number'): s for s in staff}
+        for staff_number, data, error in self.fetch_details(staff_by_number, contact_type='staff'):
+            if error:
+                print("Failed to get details for staff %s. Error: %s" % (staff_number, error))
+                continue
+            s = staff_by_number[staff_number]
+            staff_type = data['staff']['employment']['staff_type']
+            s.data.update({'staff_type': staff_type})
+            s.save()
 
-    def get_past_students(self, url=''):
-        if not url:
-            url = self.past_student_url
-        resp = requests.get(url, headers=self.headers)
-        if resp.ok:
-            data = resp.json()['data']
-            for con in data:
-                email = con['general_info']['email_address']
-                first_name = con['general_info']['firstname']
-                last_name = con['general_info']['surname']
-                if email:
-                    if is_email_valid(email):
-                        pass  # Do something with this contact
-                    else:
-                        print("%s %s has invalid email address %s" % (first_name, last_name, email))
+    def process_past_students(self, data):
+        for con in data:
+            email = con['general_info']['email_address']
+            first_name = con['general_info']['firstname']
+            last_name = con['general_info']['surname']
+            if email:
+                reason = default_validator.check(email)
+                if reason is None:
+                    pass  # Do something with this contact
                 else:
-                    print("%s %s has no email address" % (first_name, last_name))
-        return resp
+                    print("%s %s has invalid email address %s (%s)" % (first_name, last_name, email, reason))
+            else:
+                print("%s %s has no email address" % (first_name, last_name))
 
-    def get_all_past_students(self):
-        resp = self.get_past_students()
-        if resp.ok:
-            next_url = resp.json()['pagination']['next']
-            while next_url:
-                resp = self.get_past_students(url=next_url)
-                try:
-                    next_url = resp.json()['pagination']['next']
-                except KeyError:
-                    return
+    def get_past_students(self, url=''):
+        return self.process_page(url or self.past_student_url, self.process_past_students)
+
+    def get_all_past_students(self, prefetch=None):
+        for page in self.paginate(self.past_student_url, prefetch).pages():
+            self.process_past_students(page['data'])
+
+
+class AsyncEdumateClient(AsyncClient):
+    """
+    Same methods as EdumateClient but they're coroutines. See utils/async_clients.py for how to use it.
+    """
+    client_class = EdumateClient
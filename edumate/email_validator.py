@@ -0,0 +1,169 @@
+"""
+Email validation for cleaning up contact lists. It accepts the same addresses as the regex the Edumate client used to
+have, plus a 254 character limit, but it's a single pass over the address so there's nothing to backtrack on however
+broken the input is. Most addresses look like first.last@school.edu.au and are accepted by a simple precompiled
+pattern before the full check runs. Results are cached, so carers listed against several students are only checked
+once.
+
+valid, invalid = validate_emails(['jane@example.com', 'bad@@example.com'])
+for email, reason in invalid:
+    print(email, reason)
+
+Run benchmarks/bench_email_validator.py to see how it copes with nasty input.
+
+"""
+
+import re
+import threading
+from collections import OrderedDict
+
+# Characters allowed in an unquoted local part or domain, same as the old regex [-!#-'*+/-9=?A-Z^-~]
+ATEXT = frozenset("-!#$%&'*+/0123456789=?ABCDEFGHIJKLMNOPQRSTUVWXYZ^_`abcdefghijklmnopqrstuvwxyz{|}~")
+# Characters allowed in a quoted local part without a backslash
+QTEXT = frozenset(chr(c) for c in range(0x20, 0x7f) if chr(c) not in '"\\') | {'\t'}
+# Characters allowed inside a [domain literal]
+DTEXT = frozenset(chr(c) for c in range(0x20, 0x7f) if chr(c) not in '[\\]') | {'\t'}
+
+# The common shape. Atoms can't contain dots so this can't backtrack
+COMMON = re.compile(r"(?:[A-Za-z0-9_%+-]+\.)*[A-Za-z0-9_%+-]+@(?:[A-Za-z0-9-]+\.)*[A-Za-z0-9-]+")
+
+
+def check_dot_atom(text, part):
+    """
+    :return: Reason text is not a valid dot-atom, or None
+    """
+    if not text:
+        return "empty %s" % part
+    if text[0] == '.' or text[-1] == '.':
+        return "%s starts or ends with a dot" % part
+    previous = ''
+    for char in text:
+        if char == '.':
+            if previous == '.':
+                return "two dots in a row in %s" % part
+        elif char not in ATEXT:
+            return "invalid character %r in %s" % (char, part)
+        previous = char
+    return None
+
+
+def split_quoted(email):
+    """
+    Reads a quoted local part from the start of email.
+    :return: (index of the character after the closing quote, reason or None)
+    """
+    i = 1
+    length = len(email)
+    while i < length:
+        char = email[i]
+        if char == '"':
+            if i == 1:
+                return i + 1, "empty quoted local part"
+            return i + 1, None
+        if char == '\\':
+            if i + 1 == length or email[i + 1] not in QTEXT and email[i + 1] not in '"\\':
+                return i, "bad escape in quoted local part"
+            i += 2
+            continue
+        if char not in QTEXT:
+            return i, "invalid character %r in quoted local part" % char
+        i += 1
+    return i, "unterminated quoted local part"
+
+
+def check_email(email, max_length=254):
+    """
+    :return: None if the address is valid, otherwise the reason it isn't
+    """
+    if not email:
+        return "empty address"
+    if len(email) > max_length:
+        return "longer than %s characters" % max_length
+    if COMMON.fullmatch(email):
+        return None
+
+    if email[0] == '"':
+        at, reason = split_quoted(email)
+        if reason:
+            return reason
+        if at == len(email) or email[at] != '@':
+            return "missing @ after quoted local part"
+    else:
+        at = email.find('@')
+        if at == -1:
+            return "missing @"
+        reason = check_dot_atom(email[:at], 'local part')
+        if reason:
+            return reason
+
+    domain = email[at + 1:]
+    if domain.startswith('['):
+        if not domain.endswith(']') or len(domain) == 1:
+            return "unterminated domain literal"
+        for char in domain[1:-1]:
+            if char not in DTEXT:
+                return "invalid character %r in domain literal" % char
+        return None
+    return check_dot_atom(domain, 'domain')
+
+
+class EmailValidator(object):
+    """
+    Validates addresses and remembers the last cache_size answers. Safe to share between threads, default_validator is
+    used by every client in the process.
+    """
+
+    def __init__(self, cache_size=100000, max_length=254):
+        self.cache_size = cache_size
+        self.max_length = max_length
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def check(self, email):
+        """
+        :return: None if the address is valid, otherwise the reason it isn't
+        """
+        with self.lock:
+            try:
+                reason = self.cache[email]
+            except KeyError:
+                pass
+            else:
+                self.cache.move_to_end(email)
+                return reason
+        # Checked outside the lock so threads don't queue up behind each other. Two threads might both check the same
+        # new address, which only costs a little time
+        reason = check_email(email, self.max_length)
+        with self.lock:
+            self.cache[email] = reason
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return reason
+
+    def is_valid(self, email):
+        return self.check(email) is None
+
+    def validate(self, emails):
+        """
+        :param emails: Iterable of addresses
+        :return: (list of valid addresses, list of (address, reason) tuples for the invalid ones), in input order
+        """
+        valid = []
+        invalid = []
+        for email in emails:
+            reason = self.check(email)
+            if reason is None:
+                valid.append(email)
+            else:
+                invalid.append((email, reason))
+        return valid, invalid
+
+
+default_validator = EmailValidator()
+
+
+def validate_emails(emails):
+    """
+    Bulk validation with the shared validator. See EmailValidator.validate
+    """
+    return default_validator.validate(emails)
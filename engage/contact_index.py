@@ -0,0 +1,69 @@
+"""
+Links Engage pupils to their contacts in one pass so we don't loop over every pupil twice and copy the same carer once
+per child. Build it from the output of EngageApi.get_contacts() and EngageApi.get_pupils():
+
+index = ContactIndex(client.get_contacts(), client.get_pupils())
+for carer, student_years in index.carer_years():
+    print(carer['email'], student_years)
+
+"""
+
+
+class ContactIndex(object):
+
+    def __init__(self, contacts, pupils, pupil_key='pupilId'):
+        """
+        :param contacts: Dict of contactId to list of contact dicts, as returned by EngageApi.get_contacts()
+        :param pupils: List of pupil dicts, as returned by EngageApi.get_pupils()
+        :param pupil_key: Pupil field used to look up a pupil's contacts with contact_ids_for_pupil
+        """
+        self.contacts = contacts
+        self.pupils = pupils
+        self.pupil_key = pupil_key
+        self.pupil_contact_ids = None  # Built the first time you call contact_ids_for_pupil
+        self.contact_years = {}  # contactId -> year groups of their children in the order we saw them, no duplicates
+        for pupil in pupils:
+            try:
+                contact_ids = [con['contactId'] for con in pupil['contacts']]
+            except KeyError:
+                continue
+            year_group = pupil['yearGroup']
+            for contact_id in contact_ids:
+                years = self.contact_years.get(contact_id)
+                if years is None:
+                    self.contact_years[contact_id] = [year_group]
+                elif year_group not in years:
+                    years.append(year_group)
+
+    def student_years(self, contact_id):
+        return list(self.contact_years.get(contact_id, ()))
+
+    def contact_ids_for_pupil(self, pupil_id):
+        if self.pupil_contact_ids is None:
+            self.pupil_contact_ids = {}
+            for pupil in self.pupils:
+                try:
+                    contact_ids = tuple(con['contactId'] for con in pupil['contacts'])
+                except KeyError:
+                    continue
+                self.pupil_contact_ids[pupil.get(self.pupil_key)] = contact_ids
+        return self.pupil_contact_ids.get(pupil_id, ())
+
+    def carer_years(self):
+        """
+        Yields (contact, student_years) for every contact linked to at least one current pupil, exactly once. Nothing
+        is copied: the contact dicts are the ones from self.contacts and student_years is the index's own list, so
+        don't change either if you still need them.
+        """
+        for contact_id, years in self.contact_years.items():
+            for contact in self.contacts.get(contact_id, []):
+                yield contact, years
+
+    def carers(self):
+        """
+        Same as carer_years but sets data['student_years'] on each contact dict in place and yields the dict, which is
+        the shape bundle_contacts has always returned.
+        """
+        for contact, student_years in self.carer_years():
+            contact['data']['student_years'] = student_years
+            yield contact
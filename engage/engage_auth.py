@@ -0,0 +1,103 @@
+"""
+Engage tokens only last 60 minutes, which isn't long enough for some syncs. TokenManager keeps the current token and
+gets a new one in the background a few minutes before it runs out. EngageTokenAuth puts the token on every request and
+if Engage still comes back with a 401 it gets a fresh token and replays the request once.
+
+Only one thread ever fetches a token at a time. Everyone else either keeps using the token that's still valid or
+waits for that one refresh, so lots of concurrent requests hitting a 401 together cause a single token call.
+
+"""
+
+import threading
+import time
+
+from requests.auth import AuthBase
+
+
+class TokenManager(object):
+
+    def __init__(self, fetch_token, lifetime=3600, refresh_margin=300):
+        """
+        :param fetch_token: Callable that gets a new token from Engage
+        :param lifetime: Seconds a token is valid for
+        :param refresh_margin: Start a background refresh this many seconds before the token runs out
+        """
+        self.fetch_token = fetch_token
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self.token = None
+        self.expires_at = 0
+        self.refreshing = False
+        self.lock = threading.Lock()  # Guards token, expires_at and refreshing
+        self.refresh_lock = threading.Lock()  # Held while we're fetching a token
+
+    def get(self):
+        """
+        Returns a valid token. Only blocks if there's no valid token at all.
+        """
+        with self.lock:
+            token = self.token
+            remaining = self.expires_at - time.monotonic()
+            if token is not None and remaining > 0:
+                if remaining < self.refresh_margin and not self.refreshing:
+                    self.refreshing = True
+                    threading.Thread(target=self._background_refresh, args=(token,), daemon=True).start()
+                return token
+        return self.refresh(stale=token)
+
+    def refresh(self, stale=None):
+        """
+        Fetches a new token unless another thread has already replaced stale with a valid one, in which case that one
+        is returned instead.
+        """
+        with self.refresh_lock:
+            with self.lock:
+                if self.token is not None and self.token != stale and time.monotonic() < self.expires_at:
+                    return self.token
+            token = self.fetch_token()
+            with self.lock:
+                self.token = token
+                self.expires_at = time.monotonic() + self.lifetime
+            return token
+
+    def _background_refresh(self, stale):
+        try:
+            self.refresh(stale=stale)
+        except Exception:
+            # The current token is still good for a few minutes. If it runs out, get() fetches in the foreground and
+            # any error is raised there
+            pass
+        finally:
+            with self.lock:
+                self.refreshing = False
+
+
+class EngageTokenAuth(AuthBase):
+    """
+    requests auth that adds the bearer token and replays a request once on 401. Set it with session.auth.
+    """
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+
+    def __call__(self, r):
+        r.headers['Authorization'] = 'Bearer %s' % self.tokens.get()
+        r.register_hook('response', self.handle_401)
+        return r
+
+    def handle_401(self, response, **kwargs):
+        if response.status_code != 401:
+            return response
+        used_token = response.request.headers['Authorization'][len('Bearer '):]
+        token = self.tokens.refresh(stale=used_token)
+
+        # Read and release the failed response so its connection can be reused for the replay
+        response.content
+        response.close()
+        request = response.request.copy()
+        request.deregister_hook('response', self.handle_401)  # Only replay once
+        request.headers['Authorization'] = 'Bearer %s' % token
+        replay = response.connection.send(request, **kwargs)
+        replay.history.append(response)
+        replay.request = request
+        return replay
@@ -14,7 +14,8 @@ To use this class simply install requests with "pip install requests" and then i
 client = EngageAPi()
 
 When you instantiate the class it'll automatically authenticate and store the token under client.token which will
-be used in all the requests.
+be used in all the requests. Tokens only last 60 minutes, so the client gets a new one in the background shortly
+before that and replays a request once if Engage says 401. See engage_auth.py for how that works.
 
 Then you can call methods to fetch data and process it:
 
@@ -25,33 +26,43 @@ a good start
 
 """
 
-from requests import Session
+from engage.contact_index import ContactIndex
+from engage.engage_auth import EngageTokenAuth, TokenManager
+from engage.engage_models import EngageContact
+from utils.async_clients import AsyncClient
+from utils.session import SessionMixin, build_session
 
 
-class EngageApi(object):
-    def __init__(self):
-        self.ENGAGE_USER = ''   # You should load these from environment vars e.g. os.getenv('ENGAGE_USER')
-        self.ENGAGE_PASSWORD = ''   # You should load these from environment vars e.g. os.getenv('ENGAGE_PASSWORD')
-        self.engage_url = 'your_engage_school_url'  # This is the root URL your Engage sits on
+class EngageApi(SessionMixin):
+    def __init__(self, engage_url='your_engage_school_url', engage_user='', engage_password=''):
+        # You should load these from environment vars e.g. os.getenv('ENGAGE_USER') and os.getenv('ENGAGE_PASSWORD')
+        self.ENGAGE_USER = engage_user
+        self.ENGAGE_PASSWORD = engage_password
+        self.engage_url = engage_url  # This is the root URL your Engage sits on
         self.base_url = self.engage_url + '/api/v1/'
         self.token_url = self.engage_url + '/api/gettoken'
-        self.session = Session()
-        self.token = self.get_token()
-        headers = {"Authorization": "Bearer %s" % self.token}
-        self.session.headers = headers
+        self.session = build_session()
+        self.tokens = TokenManager(self.get_token, lifetime=60 * 60)
+        self.session.auth = EngageTokenAuth(self.tokens)
+        self.tokens.get()
         self.pupils_url = self.base_url + "personaldetails/getcurrentpupilinfo/"
         self.contacts_url = self.base_url + "personaldetails/getcontactinfo/"
 
+    @property
+    def token(self):
+        return self.tokens.get()
+
     def get_token(self):
         """
-        Return one time API token for use in every request for 60 minutes.
+        Return one time API token for use in every request for 60 minutes. You don't need to call this yourself,
+        self.tokens calls it when the token needs refreshing.
         """
-        s = Session()
         data = {
             "username": self.ENGAGE_USER,
             "password": self.ENGAGE_PASSWORD,
         }
-        response = s.post(self.token_url, data)
+        # The no-op auth stops the session putting the old bearer token on the token request itself
+        response = self.session.post(self.token_url, data, auth=lambda r: r)
         token = response.json()["access_token"]
         return token
 
@@ -70,9 +81,10 @@ class EngageApi(object):
             final_list.append(pupil)
         return final_list
 
-    def get_contacts(self):
+    def get_contacts(self, compact=False):
         """
         Gets the list of contacts from Engage and returns a dict with contact id for lookup.
+        :param compact: Give back EngageContact objects instead of dicts. See engage_models.py
         """
         contacts_url = self.base_url + "personaldetails/getcontactinfo/"
         contacts = self.session.get(contacts_url).json()
@@ -80,6 +92,9 @@ class EngageApi(object):
         for contact in contacts:
             parent_contacts = []
             for email in contact['emailAddresses']:
+                if compact:
+                    parent_contacts.append(EngageContact.from_api(contact, email))
+                    continue
                 cont_dict = {
                     'external_id': "%s-%s" % (email['contactId'], email['emailAddress']),
                     'first_name': contact['forename'],
@@ -103,30 +118,17 @@ class EngageApi(object):
         return contacts_dict
 
     def bundle_contacts(self):
-        contacts = self.get_contacts()
-        pupils = self.get_pupils()
-        final_contacts = []
-        for pupil in pupils:
-            year_group = pupil['yearGroup']
-            try:
-                student_contact_ids = [con['contactId'] for con in pupil['contacts']]
-            except KeyError:
-                continue
-            for student_contact_id in student_contact_ids:
-                for c in contacts[student_contact_id]:
-                    try:
-                        c['data']['student_years'].append(year_group)
-                    except KeyError:
-                        c['data'].update({'student_years': [year_group]})
-
-        for pupil in pupils:
-            try:
-                student_contact_ids = [con['contactId'] for con in pupil['contacts']]
-            except KeyError:
-                continue
-            for student_contact_id in student_contact_ids:
-                for c in contacts[student_contact_id]:
-                    final_contacts.append(c)
-        return final_contacts
+        """
+        Returns every contact of a current pupil once, with the year groups of their children in data['student_years'].
+        The contact dicts from get_contacts are updated in place rather than copied. See contact_index.py if you need
+        to look up contacts per pupil.
+        """
+        index = ContactIndex(self.get_contacts(), self.get_pupils())
+        return list(index.carers())
 
 
+class AsyncEngageApi(AsyncClient):
+    """
+    Same methods as EngageApi but they're coroutines. See utils/async_clients.py for how to use it.
+    """
+    client_class = EngageApi
@@ -0,0 +1,62 @@
+"""
+Compact version of the contact dicts EngageApi.get_contacts builds. Use get_contacts(compact=True) if you keep every
+contact in memory. It works with ContactIndex.carer_years but not carers(), which copies dicts. Call to_dict() when you
+need the old shape.
+
+"""
+
+
+class EngageContact(object):
+    __slots__ = ('external_id', 'first_name', 'last_name', 'email', 'is_current_parent', 'salutation', 'description',
+                 'is_primary', 'title', 'engage_id', 'is_parent')
+
+    def __init__(self, external_id, first_name, last_name, email, is_current_parent, salutation, description,
+                 is_primary, title, engage_id, is_parent):
+        self.external_id = external_id
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.is_current_parent = is_current_parent
+        self.salutation = salutation
+        self.description = description
+        self.is_primary = is_primary
+        self.title = title
+        self.engage_id = engage_id
+        self.is_parent = is_parent
+
+    @classmethod
+    def from_api(cls, contact, email):
+        """
+        :param contact: Contact from getcontactinfo
+        :param email: One of the contact's emailAddresses
+        """
+        return cls(
+            "%s-%s" % (email['contactId'], email['emailAddress']),
+            contact['forename'],
+            contact['surname'],
+            email['emailAddress'],
+            True,
+            contact['greeting'],
+            email['description'],
+            email['isPrimary'],
+            contact['title'],
+            email['contactId'],
+            True,
+        )
+
+    def to_dict(self):
+        return {
+            'external_id': self.external_id,
+            'first_name': self.first_name,
+            'last_name': self.last_name,
+            'email': self.email,
+            'is_current_parent': self.is_current_parent,
+            'data': {
+                'salutation': self.salutation,
+                'description': self.description,
+                'is_primary': self.is_primary,
+                'title': self.title,
+                'engage_id': self.engage_id,
+                'is_parent': self.is_parent
+            }
+        }
@@ -0,0 +1,114 @@
+"""
+A small thread safe pool of database connections. It doesn't care which driver you use, you just give it a function
+that opens a new DB-API connection. That means you can try it out with sqlite3 without a SQL Server:
+
+pool = ConnectionPool(lambda: sqlite3.connect('test.db', check_same_thread=False), size=2)
+rows = pool.run(lambda conn: conn.execute('SELECT 1').fetchall())
+
+Connections are opened the first time they're needed. Ones that have been sitting idle get a quick health check
+before they're handed out again, and dead ones are thrown away and replaced.
+python -m benchmarks.fake_db_pool runs those reconnect paths against a fake driver whose connections you can kill.
+
+"""
+
+import queue
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool(object):
+
+    def __init__(self, connect, size=4, health_check='SELECT 1', check_after=30, timeout=None):
+        """
+        :param connect: Callable returning a new connection e.g. functools.partial(pymssql.connect, server, user, ...)
+        :param size: Most connections open at once
+        :param health_check: Query used to check an idle connection still works
+        :param check_after: Seconds a connection can sit idle before we health check it
+        :param timeout: Seconds to wait for a free connection. None waits forever
+        """
+        self.connect = connect
+        self.size = size
+        self.health_check = health_check
+        self.check_after = check_after
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.health_check)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        if not self.slots.acquire(timeout=self.timeout):
+            raise PoolTimeout("No database connection became free within %s seconds" % self.timeout)
+        try:
+            while True:
+                try:
+                    conn, last_used = self.idle.get_nowait()
+                except queue.Empty:
+                    return self.connect()
+                if time.monotonic() - last_used < self.check_after or self.is_healthy(conn):
+                    return conn
+                self.discard(conn)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        if broken:
+            self.discard(conn)
+        else:
+            self.idle.put((conn, time.monotonic()))
+        self.slots.release()
+
+    def run(self, func, retries=1):
+        """
+        Calls func(conn) with a connection from the pool and returns what it returns. If func fails and the connection
+        turns out to be dead, the connection is thrown away and func is retried on a fresh one. Errors on a healthy
+        connection, like bad SQL, are raised straight away.
+        """
+        for attempt in range(retries + 1):
+            conn = self.acquire()
+            try:
+                result = func(conn)
+            except Exception:
+                healthy = self.rollback(conn) and self.is_healthy(conn)
+                self.release(conn, broken=not healthy)
+                if healthy or attempt == retries:
+                    raise
+            else:
+                self.release(conn)
+                return result
+
+    def rollback(self, conn):
+        try:
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(conn)
@@ -6,10 +6,144 @@ You can find more info here:
 
 https://github.com/pymssql/pymssql
 
+Big tables can be streamed instead of loaded into a list. Rows are fetched in batches so memory stays flat:
+
+client = MazeClient()
+for row in client.stream(batch_size=5000):
+    print(row['Name_First'])
+
+If you've got millions of rows, skip the dicts and work with tuples and the column index:
+
+rows = client.stream(as_dict=False)
+first_name = rows.columns['Name_First']
+for row in rows:
+    print(row[first_name])
+
+Or let get_records give you compact named tuples with only the columns you need:
+
+for student in client.get_records(fields=['ID', 'Name_First', 'House']):
+    print(student.Name_First)
+
+Connections come from a small pool, so you can run parameterised queries and several extracts at the same time:
+
+students = client.query("SELECT * FROM ST WHERE House = %s", ('Acacia',))
+results = client.run_queries({'students': "SELECT * FROM ST", 'families': "SELECT * FROM DF"})
+
+For analytics you can get the result as columns instead of rows, built straight from the cursor batches without a
+dict per row. get_numpy_columns needs "pip install numpy", get_arrow_table and write_parquet need "pip install pyarrow":
+
+columns = client.get_numpy_columns("SELECT ID, House, Year FROM ST")
+houses, counts = numpy.unique(columns['House'], return_counts=True)
+client.write_parquet('students.parquet')
+
 """
 
+import collections
+import functools
+import operator
+
 import pymssql
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from mssql_client.connection_pool import ConnectionPool
+from utils.concurrency import bounded_as_completed
+
+
+class RowStream(object):
+    """
+    Lazily streams the result of a query that has already been executed on cursor. Iterate over it for rows or call
+    batches() for lists of up to batch_size rows. names is every column name in row order and columns maps each name
+    to its position in a row, which is what you need when rows are tuples. If two columns share a name, columns only
+    has the last one, see check_names.
+    """
+
+    def __init__(self, cursor, batch_size=1000, on_close=None):
+        self.cursor = cursor
+        self.batch_size = batch_size
+        self.on_close = on_close  # Called with True if every row was read, False if the stream was closed early
+        self.finished = False
+        self.names = [column[0] for column in cursor.description or []]
+        self.columns = {name: i for i, name in enumerate(self.names)}
+
+    def check_names(self):
+        """
+        Raises ValueError if a column has no name, like an unaliased COUNT(*), or shares its name with another column,
+        like st.ID and df.ID. Alias them in the query.
+        """
+        empty = [i for i, name in enumerate(self.names) if not name]
+        if empty:
+            raise ValueError("Columns at positions %s have no name. Alias them in the query" % empty)
+        duplicates = sorted(name for name in self.columns if self.names.count(name) > 1)
+        if duplicates:
+            raise ValueError("More than one column is called %s. Alias them in the query" % ', '.join(duplicates))
+
+    def batches(self):
+        try:
+            while True:
+                rows = self.cursor.fetchmany(self.batch_size)
+                if not rows:
+                    self.finished = True
+                    return
+                yield rows
+        finally:
+            self.close()
+
+    def close(self):
+        """
+        Closes the cursor. Called for you once the stream is used up, call it yourself if you stop early.
+        """
+        if self.cursor is None:
+            return
+        cursor, self.cursor = self.cursor, None
+        try:
+            cursor.close()
+        finally:
+            if self.on_close:
+                self.on_close(self.finished)
+
+    def __iter__(self):
+        for rows in self.batches():
+            yield from rows
+
+    def records(self, fields=None, name='Row'):
+        """
+        Yields rows as named tuples holding only fields. A named tuple is about the size of a plain tuple, much smaller
+        than a dict. The stream needs to be opened with as_dict=False.
+        :param fields: Column names to keep. Defaults to every column. Columns without a name, or with one that isn't
+        a valid Python identifier or repeats an earlier column, are renamed _<position> like namedtuple(rename=True)
+        does
+        :param name: Name of the named tuple class
+        """
+        if fields is None:
+            fields = self.names
+            positions = range(len(self.names))
+        else:
+            fields = list(fields)
+            for field in fields:
+                if self.names.count(field) != 1:
+                    self.close()
+                    raise ValueError("%s isn't exactly one column of the result. Alias it in the query" % field)
+            positions = [self.columns[field] for field in fields]
+        row_class = collections.namedtuple(name, fields, rename=True)
+        pick = operator.itemgetter(*positions)
+        make = row_class._make
+        if len(fields) == 1:
+            for row in self:
+                yield make((pick(row),))
+        else:
+            for row in self:
+                yield make(pick(row))
+
 
 class MazeClient(object):
     def __init__(self):
@@ -17,25 +151,142 @@ class MazeClient(object):
         self.user = 'MSSQL_USERNAME'
         self.password = 'MSSQL_PASS'
         self.db = 'MSSQL_DBNAME'
-        self.conn = pymssql.connect(self.server, self.user, self.password, self.db)
+        self.pool = ConnectionPool(
+            functools.partial(pymssql.connect, self.server, self.user, self.password, self.db),
+            size=4,  # How many queries can run at once
+        )
         self.q = "SELECT * FROM ST"  # Your query goes here
 
+    def query(self, sql, params=None, as_dict=True):
+        """
+        Runs a query on a pooled connection and returns all the rows. Pass values in params instead of formatting them
+        into the SQL yourself, pymssql uses %s placeholders.
+        :param sql: SQL to run
+        :param params: Tuple of values for the %s placeholders, or a dict for %(name)s ones
+        :param as_dict: Rows are dicts if True, otherwise tuples
+        :return: List of rows
+        """
+        def run(conn):
+            cursor = conn.cursor(as_dict=as_dict)
+            try:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+        return self.pool.run(run)
+
+    def run_queries(self, queries, as_dict=True):
+        """
+        Runs several extract queries at the same time, each on its own pooled connection.
+        :param queries: Dict of name to SQL, or name to (SQL, params)
+        :return: Dict of name to list of rows
+        """
+        def run(name):
+            sql = queries[name]
+            if isinstance(sql, tuple):
+                return self.query(sql[0], sql[1], as_dict=as_dict)
+            return self.query(sql, as_dict=as_dict)
+
+        results = {}
+        for name, rows, error in bounded_as_completed(run, queries, max_workers=self.pool.size):
+            if error is not None:
+                raise error
+            results[name] = rows
+        return results
+
+    def stream(self, query=None, params=None, batch_size=1000, as_dict=True):
+        """
+        Runs the query and returns a RowStream which fetches rows batch_size at a time as you iterate over it. The
+        stream holds on to a pooled connection until it's used up or closed. If you close it early, or break out of a
+        loop over it, the unread rows are cancelled before the connection goes back to the pool.
+        :param query: SQL to run. Defaults to self.q
+        :param params: Values for the %s placeholders in query
+        :param batch_size: How many rows to fetch from the server at a time
+        :param as_dict: Rows are dicts if True, otherwise tuples. Use RowStream.columns to find a column in a tuple
+        :return: RowStream
+        """
+        conn = self.pool.acquire()
+        try:
+            cursor = conn.cursor(as_dict=as_dict)
+            cursor.execute(query or self.q, params)
+        except Exception:
+            self.pool.release(conn, broken=not self.pool.is_healthy(conn))
+            raise
+
+        def release(finished):
+            # Rows left unread are still pending on the connection, so cancel them before anyone else gets it
+            broken = False
+            if not finished:
+                try:
+                    conn.cancel()
+                except Exception:
+                    broken = True
+            self.pool.release(conn, broken=broken)
+
+        return RowStream(cursor, batch_size, on_close=release)
+
+    def get_columns(self, query=None, params=None, batch_size=10000):
+        """
+        Runs the query and returns the result as a dict of column name to list of values. Rows are fetched as tuples and
+        split into the columns one batch at a time. Every column needs its own name, see RowStream.check_names.
+        """
+        rows = self.stream(query, params, batch_size=batch_size, as_dict=False)
+        try:
+            rows.check_names()
+        except ValueError:
+            rows.close()
+            raise
+        columns = [[] for _ in rows.names]
+        for batch in rows.batches():
+            for column, values in zip(columns, zip(*batch)):
+                column.extend(values)
+        return dict(zip(rows.names, columns))
+
+    def get_numpy_columns(self, query=None, params=None, batch_size=10000):
+        """
+        Same as get_columns but every column is a NumPy array. Numbers and bools get proper dtypes. Text, dates and
+        columns with NULLs stay as object arrays so you don't end up with fixed width strings.
+        """
+        if numpy is None:
+            raise ImportError("You need numpy for this. Install it with: pip install numpy")
+        columns = self.get_columns(query, params, batch_size)
+        for name, values in columns.items():
+            array = numpy.array(values)
+            if array.dtype.kind in 'US':
+                array = numpy.array(values, dtype=object)
+            columns[name] = array
+        return columns
+
+    def get_arrow_table(self, query=None, params=None, batch_size=10000):
+        """
+        Same as get_columns but returns a pyarrow Table with the column types worked out by pyarrow.
+        """
+        if pyarrow is None:
+            raise ImportError("You need pyarrow for this. Install it with: pip install pyarrow")
+        return pyarrow.table(self.get_columns(query, params, batch_size))
+
+    def write_parquet(self, path, query=None, params=None, batch_size=10000):
+        """
+        Runs the query and saves the result to a Parquet file at path.
+        """
+        table = self.get_arrow_table(query, params, batch_size)
+        pyarrow.parquet.write_table(table, path)
+
+    def get_records(self, query=None, params=None, fields=None, batch_size=1000):
+        """
+        Streams the query as compact named tuples. See RowStream.records
+        """
+        return self.stream(query, params, batch_size=batch_size, as_dict=False).records(fields)
+
     def get_all_rows(self):
-        rows = []
-        cursor = self.conn.cursor(as_dict=True)
-        cursor.execute(self.q)
-        for row in cursor:
-            rows.append(row)
-        return rows
+        return list(self.stream())
 
     def get_students_from_maze(self):
         """
 
         """
-        cursor = self.conn.cursor(as_dict=True)
-        cursor.execute(self.q)
         contacts = []
-        for row in cursor:
+        for row in self.stream():
             contact = {
                 "first_name": row.get('Name_First', ''),
                 # Each row in a dict and you access it like above. I like working with dictionaries so I always convert
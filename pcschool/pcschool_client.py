@@ -11,6 +11,21 @@ The only package you need, which doesn't come with Python, is Python Requests. Y
 
 pip install requests
 
+Lookups like houses and nationalities hardly ever change, so they're cached for a day. Give the cache a path if you
+want them to survive between runs too, or invalidate it when you know something changed:
+
+client.cache = ResponseCache(path='pcschool_lookups.db')
+client.cache.invalidate()
+
+When you need all the lookups, e.g. at the start of an enrolment import, get them in one go. They're fetched at the
+same time so it takes about as long as a single call:
+
+lookups = client.get_all_lookups()
+lookups.nationalities.by_code['AUS']  # 'Australia'
+lookups.houses.by_description['Acacia - yellow']  # 'Acacia'
+
+To push enrolment applications in, use EnrolmentImporter in pcschool_import.py.
+
 """
 
 import base64
@@ -18,17 +33,71 @@ import datetime
 import time
 import hmac
 import hashlib
-import requests
 
-
-class PCSchoolClient(object):
-    def __init__(self) -> None:
-        self.session = requests.Session()
-        self.base_url = ''
-        self.username = ''
-        self.password = ''
-        self.private_key = ''
-        self.api_key = ''
+from utils.async_clients import AsyncClient
+from utils.concurrency import bounded_as_completed
+from utils.response_cache import ResponseCache
+from utils.session import SessionMixin, build_session
+
+# Name of each lookup on ReferenceData and the PCSchool event it comes from
+LOOKUP_EVENTS = {
+    'houses': 'HOUSE',
+    'nationalities': 'NATIONALITY',
+    'ethnicities': 'ETHNICITY',
+    'languages': 'LANGUAGE',
+    'schools': 'SCHOOL',
+    'countries': 'COUNTRY',
+    'years': 'YEAR',
+}
+
+
+class Lookup(object):
+    """
+    One PCSchool lookup as a code -> description dict and a description -> code dict
+    """
+
+    def __init__(self, by_code):
+        self.by_code = by_code
+        self.by_description = {description: code for code, description in by_code.items()}
+
+    @classmethod
+    def from_response(cls, data):
+        """
+        Handles both response shapes. Houses and years come back as {code: description}, the rest as
+        {'120': {'Code': 'AFG', 'Description': 'Afghanistan'}}
+        """
+        by_code = {}
+        for key, value in data.items():
+            if isinstance(value, dict):
+                by_code[value['Code']] = value['Description']
+            else:
+                by_code[key] = value
+        return cls(by_code)
+
+
+class ReferenceData(object):
+    """
+    All the PCSchool lookups. Each attribute is a Lookup.
+    """
+
+    def __init__(self, houses, nationalities, ethnicities, languages, schools, countries, years):
+        self.houses = houses
+        self.nationalities = nationalities
+        self.ethnicities = ethnicities
+        self.languages = languages
+        self.schools = schools
+        self.countries = countries
+        self.years = years
+
+
+class PCSchoolClient(SessionMixin):
+    def __init__(self, base_url='', username='', password='', private_key='', api_key='') -> None:
+        self.session = build_session()
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.private_key = private_key
+        self.api_key = api_key
         authorisation = self.get_authorisation()
         self.session.headers.update({"Authorization": "Basic %s" % authorisation})
         self.lookup_url = self.base_url + "/Handlers/External/Enrolment.asmx/Handler"
@@ -36,6 +105,7 @@ class PCSchoolClient(object):
             self.base_url + "/Handlers/External/Enrolment.asmx/ImportHandler"
         )
         self.poll_url = self.base_url + "/Handlers/External/Enrolment.asmx/PollHandler"
+        self.cache = ResponseCache(ttl=24 * 60 * 60)  # Used for lookups. Set to None to always hit the API
 
     def get_authorisation(self):
         # base 64 encoded string separated by a colon
@@ -62,7 +132,7 @@ class PCSchoolClient(object):
         )
         return signature
 
-    def post_request(self, url, payload):
+    def post_request(self, url, payload, headers=None):
         """
         Every request needs:
         ts: unix timestamp in milliseconds
@@ -72,13 +142,44 @@ class PCSchoolClient(object):
         ts = int(time.mktime(now.timetuple()) * 1000)
         hmac = self.get_hmac(ts)
         payload.update({"ts": ts, "hmac": hmac})
-        headers = {"Content-Type": "application/json; charset=utf-8"}
+        headers = dict(headers or {}, **{"Content-Type": "application/json; charset=utf-8"})
         response = self.session.post(url, json=payload, headers=headers)
         return response
 
     def lookup_request(self, payload):
         url = self.lookup_url
-        return self.post_request(url, payload)
+        if self.cache is None:
+            return self.post_request(url, payload)
+        key = "%s %s" % (url, payload["Event"])
+        return self.cache.fetch(key, lambda headers: self.post_request(url, payload, headers=headers))
+
+    def import_enrolment(self, payload):
+        """
+        Sends one enrolment application to the ImportHandler. PCSchool processes it in the background and gives you a
+        job you check on with poll_import.
+        """
+        return self.post_request(self.enrolment_url, payload)
+
+    def poll_import(self, payload):
+        return self.post_request(self.poll_url, payload)
+
+    def get_all_lookups(self):
+        """
+        Fetches every lookup at the same time over the client session. Each request is signed with its own ts and hmac
+        in post_request like any other call.
+        :return: ReferenceData
+        """
+        def fetch(name):
+            response = self.lookup_request({"Event": LOOKUP_EVENTS[name]})
+            response.raise_for_status()
+            return Lookup.from_response(response.json())
+
+        lookups = {}
+        for name, lookup, error in bounded_as_completed(fetch, LOOKUP_EVENTS, max_workers=len(LOOKUP_EVENTS)):
+            if error is not None:
+                raise error
+            lookups[name] = lookup
+        return ReferenceData(**lookups)
 
     def get_houses(self):
         """
@@ -141,8 +242,8 @@ class PCSchoolClient(object):
         return self.lookup_request(payload)
 
 
-
-
-
-
-
+class AsyncPCSchoolClient(AsyncClient):
+    """
+    Same methods as PCSchoolClient but they're coroutines. See utils/async_clients.py for how to use it.
+    """
+    client_class = PCSchoolClient
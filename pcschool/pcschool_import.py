@@ -0,0 +1,93 @@
+"""
+Pushes a batch of enrolment applications into PCSchool. Each application is sent to the ImportHandler and then we poll
+the PollHandler until the import job finishes. Several applications are in flight at once, and polling backs off while
+a job's status isn't changing so we don't hammer PollHandler.
+
+client = PCSchoolClient()
+importer = EnrolmentImporter(client, max_workers=8)
+for application, result, error in importer.run(applications):
+    print(application['StudentSurname'], result or error)
+
+The key names below are the ones we've seen from PCSchool. Check them against the docs for your version and override
+them on the class if they differ. The importer only calls client.import_enrolment and client.poll_import, so you can
+test it with a fake client that returns canned responses. python -m benchmarks.fake_pcschool_import runs it against a
+fake ImportHandler and PollHandler on localhost and checks the poll backoff.
+
+"""
+
+import random
+import time
+
+from utils.concurrency import bounded_as_completed
+
+
+class EnrolmentImportError(Exception):
+    pass
+
+
+class EnrolmentImporter(object):
+    job_id_key = 'JobId'  # Where the ImportHandler response puts the job id, and what we send to PollHandler
+    status_key = 'Status'
+    done_statuses = ('Complete', 'Completed', 'Success')
+    failed_statuses = ('Failed', 'Error')
+
+    def __init__(self, client, max_workers=8, first_poll=1, max_poll=30, backoff=2, timeout=600):
+        """
+        :param client: PCSchoolClient
+        :param max_workers: How many applications to import at once
+        :param first_poll: Seconds to wait before the first poll
+        :param max_poll: Longest we'll wait between polls
+        :param backoff: How much longer to wait each time a job's status hasn't changed
+        :param timeout: Give up on a job after this many seconds
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.first_poll = first_poll
+        self.max_poll = max_poll
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def submit(self, application):
+        response = self.client.import_enrolment(dict(application))
+        if not response.ok:
+            raise EnrolmentImportError("PCSchool rejected the application. Error: %s" % response.text)
+        return response.json()[self.job_id_key]
+
+    def wait(self, job_id):
+        """
+        Polls until the job is done and returns the last poll response. The delay grows while the status stays the
+        same and drops back to first_poll when it changes, since that usually means the job is moving.
+        """
+        deadline = time.monotonic() + self.timeout
+        delay = self.first_poll
+        last_status = None
+        while True:
+            # A bit of jitter stops a batch of jobs submitted together from polling in lockstep
+            time.sleep(delay * random.uniform(0.8, 1.2))
+            response = self.client.poll_import({self.job_id_key: job_id})
+            if not response.ok:
+                raise EnrolmentImportError("Failed to poll import job %s. Error: %s" % (job_id, response.text))
+            result = response.json()
+            status = result.get(self.status_key)
+            if status in self.done_statuses:
+                return result
+            if status in self.failed_statuses:
+                raise EnrolmentImportError("Import job %s failed: %s" % (job_id, result))
+            if time.monotonic() > deadline:
+                raise EnrolmentImportError("Import job %s still %s after %s seconds" % (job_id, status, self.timeout))
+            if status == last_status:
+                delay = min(delay * self.backoff, self.max_poll)
+            else:
+                delay = self.first_poll
+            last_status = status
+
+    def import_one(self, application):
+        return self.wait(self.submit(application))
+
+    def run(self, applications):
+        """
+        Imports every application, max_workers at a time.
+        :return: Generator of (application, result, error) tuples as each import finishes. result is the final poll
+        response and error is None unless that application failed
+        """
+        return bounded_as_completed(self.import_one, applications, max_workers=self.max_workers)
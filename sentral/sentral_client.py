@@ -12,12 +12,48 @@ pip install requests
 
 Info on Python requests https://pypi.org/project/requests/
 
+Big syncs spend most of their time waiting on Sentral. You can fetch a few pages at once by setting page_concurrency
+on the client or passing concurrency to get_all and get_staff. Pages are still processed in order:
+
+client.get_all(concurrency=4)
+
+Most records don't change between nightly runs. get_changes remembers what it saw last time in a local SQLite file and
+only gives you what was created, updated or deleted since:
+
+store = SyncStore('sentral_sync.db')
+changes = client.get_changes(store, client.person_url)
+for person in changes['updated']:
+    print(person['id'])
+
+Houses and academic periods are cached for a day. Give the cache a path if you want them to survive between runs:
+
+client.cache = ResponseCache(path='sentral_lookups.db')
+
+iter_models gives you compact objects instead of the raw JSON:API dicts if you need to hold lots of records in memory.
+See sentral/sentral_models.py.
+
+sync_contacts pages through persons, phones and emails together and gives you each person with their phones and emails
+attached, without downloading everything first:
+
+for contact in client.sync_contacts():
+    print(contact['id'], len(contact['phones']), len(contact['emails']))
+
 Sentral API info can be found here http://development.sentral.com.au/
 
 """
 
 import datetime
-from requests import Session
+import itertools
+from urllib.parse import urlencode
+
+from sentral.sentral_contacts import ContactJoin
+from sentral.sentral_included import IdentityMap, IncludedIndex
+from sentral.sentral_models import decode_page
+from sentral.sentral_sync_store import record_hash
+from utils.async_clients import AsyncClient
+from utils.paginator import Paginator
+from utils.response_cache import ResponseCache
+from utils.session import SessionMixin, build_session
 
 
 def get_campus(campus_id):
@@ -28,14 +64,17 @@ def get_campus(campus_id):
     }.get(campus_id, "")
 
 
-class SentralClient(object):
+class SentralClient(SessionMixin):
 
-    def __init__(self):
-        self.school_sentral_url = ''
+    def __init__(self, school_sentral_url='', sentral_key="SENTRAL_KEY", sentral_tenant_id="SENTRAL_TENANT_ID"):
+        """
+        The defaults are placeholders. Pass your own when you sync more than one school from the same process
+        """
+        self.school_sentral_url = school_sentral_url
         self.base_url = self.school_sentral_url + "/restapi"
-        self.sentral_key = "SENTRAL_KEY"
-        self.sentral_tenant_id = "SENTRAL_TENANT_ID"
-        self.session = Session()
+        self.sentral_key = sentral_key
+        self.sentral_tenant_id = sentral_tenant_id
+        self.session = build_session()
         self.session.headers = {
             "X-API-KEY": self.sentral_key,
             "X-API-TENANT": self.sentral_tenant_id,
@@ -57,6 +96,24 @@ class SentralClient(object):
         self.houses_url = self.base_url + '/v1/enrolments/house'
         self.academic_period_url = self.base_url + '/v1/enrolments/academic-period'
         self.staff_url = self.base_url + '/v1/enrolments/staff'
+        self.cache = ResponseCache(ttl=24 * 60 * 60)  # Used for lookups. Set to None to always hit the API
+        self.page_concurrency = 1  # How many pages get_all and get_staff fetch at once. 1 walks links.next as before
+        self.identity_map_size = 50000  # How many included resources get_all remembers across pages
+        self.included_handlers = {  # Which method get_persons calls for each type of included resource
+            'enrolment': self.process_enrolment,
+            'student': self.process_student,
+            'studentPersonRelation': self.process_student_person_relation,
+            'household': self.process_household,
+        }
+
+    def cached_get(self, url, params=None):
+        """
+        GET through self.cache. Only use it for data that hardly ever changes.
+        """
+        if self.cache is None:
+            return self.session.get(url, params=params)
+        key = url + '?' + urlencode(sorted((params or {}).items()))
+        return self.cache.fetch(key, lambda headers: self.session.get(url, params=params, headers=headers))
 
     def get_houses(self):
         """
@@ -65,7 +122,7 @@ class SentralClient(object):
         """
         params = {'limit': 100}
         houses = []
-        response = self.session.get(self.houses_url, params=params).json()
+        response = self.cached_get(self.houses_url, params=params).json()
         for house_dict in response['data']:
             # You can access house info like this
             house_name = house_dict['attributes']['name']
@@ -75,21 +132,56 @@ class SentralClient(object):
     def get_academic_periods(self):
         params = {'limit': 100}
         academic_periods = []
-        response = self.session.get(self.academic_period_url, params=params).json()
+        response = self.cached_get(self.academic_period_url, params=params).json()
         for ap_dict in response['data']:
             # You can access data as follows
             ap_year = ap_dict['attributes']['year']
             academic_periods.append(ap_dict)
         return academic_periods
 
-    def get_staff(self, url=None):
+    def paginate(self, url, params, concurrency=None, prefetch=0):
+        """
+        Returns a Paginator over a Sentral list endpoint. With concurrency above 1 the pages are requested by offset,
+        several at a time, so the next pages are already on their way while you're processing the current one. We stop
+        at the first page without a next link and ignore anything fetched past it.
+        :param url: List endpoint URL
+        :param params: Query params. Needs 'limit' when concurrency is above 1
+        :param concurrency: How many pages to fetch at once. Defaults to self.page_concurrency
+        :param prefetch: When walking links, how many pages to fetch ahead on a background thread
+        :return: Paginator yielding page dicts from pages() or records when you iterate over it
+        """
+        concurrency = concurrency or self.page_concurrency
+
+        def next_url(response):
+            return response['links'].get('next')
+
+        if concurrency <= 1:
+            return Paginator(lambda page_url: self.session.get(page_url, params=params).json(), url, next_url,
+                             prefetch=prefetch)
+        page_urls = ('%s?%s' % (url, urlencode(dict(params, offset=offset)))
+                     for offset in itertools.count(0, params['limit']))
+        return Paginator(lambda page_url: self.session.get(page_url).json(), next_url=next_url, page_urls=page_urls,
+                         prefetch=concurrency - 1)
+
+    def iter_pages(self, url, params, concurrency=None):
+        """
+        Yields every page of a Sentral list endpoint in order. See paginate.
+        """
+        yield from self.paginate(url, params, concurrency).pages()
+
+    def iter_models(self, url, params, concurrency=None):
+        """
+        Yields (data, included) per page with every resource decoded into its compact model from sentral_models.
+        Resources without a model are dropped.
+        """
+        for response in self.iter_pages(url, params, concurrency=concurrency):
+            yield decode_page(response)
+
+    def get_staff(self, url=None, concurrency=None):
         if not url:
             url = self.staff_url
         params = {'include': 'person', 'limit': 100}
-        response = self.session.get(url, params=params).json()
-        self.save_staff(response)
-        while 'next' in response['links'].keys():
-            response = self.session.get(response['links']['next'], params=params).json()
+        for response in self.iter_pages(url, params, concurrency=concurrency):
             self.save_staff(response)
 
     def save_staff(self, response):
@@ -97,36 +189,108 @@ class SentralClient(object):
             # This is where you implement some logic that will operate on
             pass
 
-    def get_all(self, url=None):
+    def get_all(self, url=None, concurrency=None):
         if not url:
             url = self.person_url
         params = {'include': 'primaryHousehold,studentPrimaryEnrolment,student,studentContacts', 'limit': 200}
-        response = self.session.get(url, params=params).json()
-        self.get_persons(response)
-        while 'next' in response['links'].keys():
-            # We keep looping here until we get to the last page and "next" is not inside the pagination section
-            response = self.session.get(response['links']['next'], params=params).json()
-            self.get_persons(response)
+        identity_map = IdentityMap(self.identity_map_size)
+        # We keep going until we get to the last page and "next" is not inside the pagination section
+        for response in self.iter_pages(url, params, concurrency=concurrency):
+            self.get_persons(response, identity_map)
 
-    def get_persons(self, response):
+    def get_persons(self, response, identity_map=None):
         """
         If you use include inside the params Sentral will add additional info which is related to the person object.
-        For some reason the API doesn't fold it in against the person and instead it has a separate key 'included'
-        which you need to loop through. You can figure out what it is by type attribute.
+        For some reason the API doesn't fold it in against the person and instead it has a separate key 'included'.
+        We index it by type and id, hand every included resource to its handler in self.included_handlers and give
+        back the persons with their relationships resolved under 'related':
+
+        person['related']['primaryHousehold']['attributes']['name']
+
+        Pass the same IdentityMap for every page of a sync and resources seen on earlier pages are only handled once
+        and can still be resolved. Without one the index only covers this page.
+        :param response: Page dict
+        :param identity_map: IdentityMap shared across pages, optional
+        :return: List of hydrated person dicts
         """
+        index = IncludedIndex() if identity_map is None else identity_map
+        for inc_dict in response.get('included', []):
+            inc_dict, is_new = index.intern(inc_dict)
+            if not is_new:
+                continue
+            handler = self.included_handlers.get(inc_dict['type'])
+            if handler:
+                handler(inc_dict)
+        persons = []
         for person_dict in response['data']:
             if person_dict['type'] == 'person':
-                # This is where you process person objects
-                pass
-        for inc_dict in response.get('included', []):
-            if inc_dict['type'] == 'enrolment':
-                pass
-            if inc_dict['type'] == 'student':
-                pass
-            if inc_dict['type'] == 'studentPersonRelation':
-                pass
-            if inc_dict['type'] == 'household':
-                pass
+                person = index.hydrate(person_dict)
+                self.process_person(person)
+                persons.append(person)
+        return persons
+
+    def process_person(self, person):
+        # This is where you process person objects. Related objects are under person['related']
+        pass
+
+    def process_enrolment(self, enrolment):
+        pass
+
+    def process_student(self, student):
+        pass
+
+    def process_student_person_relation(self, relation):
+        pass
+
+    def process_household(self, household):
+        pass
+
+    def get_changes(self, store, url, params=None, modified_since_param=None):
+        """
+        Incremental sync for any Sentral list endpoint, e.g. person_url, person_phone_url or staff_url. Records are
+        compared with their hash from the last run so you only get back what changed.
+
+        If the endpoint supports a modified since filter, pass the name of that query param as modified_since_param
+        and only records changed since the last run are downloaded. Deletes can't be seen that way, so deleted will
+        be empty and you need to do a full sync now and then. Without it every page is downloaded but unchanged records
+        are skipped and deletes are picked up.
+
+        Only the records in 'data' are compared. If you need to know about changed included resources like
+        households, sync their own endpoint as well.
+        :param store: SyncStore
+        :param url: Sentral list endpoint
+        :param params: Query params. Defaults to {'limit': 200}
+        :param modified_since_param: Name of the modified since query param, if the endpoint has one
+        :return: Dict with 'created' and 'updated' lists of records and a 'deleted' list of record ids
+        """
+        params = dict(params or {'limit': 200})
+        # Go back a few minutes so clock differences with Sentral can't make us miss a change. Anything we get twice
+        # has the same hash and is skipped
+        started = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=5)
+        started = started.isoformat(timespec='seconds')
+        watermark = store.get_watermark(url)
+        full_sync = not (modified_since_param and watermark)
+        if not full_sync:
+            params[modified_since_param] = watermark
+
+        known = store.get_hashes(url)
+        seen = set()
+        changed_hashes = {}
+        changes = {'created': [], 'updated': [], 'deleted': []}
+        for response in self.iter_pages(url, params):
+            for record in response['data']:
+                record_id = record['id']
+                seen.add(record_id)
+                hash_ = record_hash(record)
+                old_hash = known.get(record_id)
+                if old_hash == hash_:
+                    continue
+                changes['created' if old_hash is None else 'updated'].append(record)
+                changed_hashes[record_id] = hash_
+        if full_sync:
+            changes['deleted'] = [record_id for record_id in known if record_id not in seen]
+        store.save(url, changed_hashes, changes['deleted'], watermark=started)
+        return changes
 
     def get_date_or_null(self, dob_str):
         """
@@ -137,7 +301,7 @@ class SentralClient(object):
             return datetime.datetime.strptime(dob_str.split('T')[0], '%Y-%m-%d')
         return
 
-    def sync_persons_phones(self, url=None):
+    def sync_persons_phones(self, url=None, concurrency=None):
         """
         There's a separate URL for this as it's not included in Person object
         :param url:
@@ -146,15 +310,45 @@ class SentralClient(object):
         if not url:
             url = self.person_phone_url
         params = {'limit': 200}
-        response = self.session.get(url, params=params).json()
-        for r in response['data']:
+        for r in self.paginate(url, params, concurrency=concurrency):
             person_id = r['relationships']['owner']['data']['id']
-            # This is how you can access parameters
+            # This is how you can access parameters. You can loop like this until you get to the end
+
+
+    def sync_contacts(self, window=10000, concurrency=None, prefetch=1):
+        """
+        Pages through persons, person phones and person emails at the same time and joins them on the owner id as the
+        pages arrive. See sentral_contacts.py for how the join window works.
+        :param window: How many people can be waiting for their records at once
+        :param concurrency: Passed on to paginate for each list
+        :param prefetch: How many pages of each list to fetch ahead when walking links
+        :return: Generator of dicts with 'id', 'person', 'phones', 'emails' and 'partial'
+        """
+        params = {'limit': 200}
+        streams = [
+            (self.paginate(self.person_url, params, concurrency, prefetch).pages(), 'add_persons'),
+            (self.paginate(self.person_phone_url, params, concurrency, prefetch).pages(), 'add_phones'),
+            (self.paginate(self.person_email_url, params, concurrency, prefetch).pages(), 'add_emails'),
+        ]
+        join = ContactJoin(window)
         try:
-            while response['links']['next']:
-                response = self.session.get(response['links']['next'], params=params).json()
-                for r in response['data']:
-                    pass
-                    # You can loop like this until you get to the end
-        except KeyError:
-            return
+            while streams:
+                # One page from each list in turn so none of them gets far ahead of the others
+                for stream in list(streams):
+                    pages, add = stream
+                    page = next(pages, None)
+                    if page is None:
+                        streams.remove(stream)
+                        continue
+                    yield from getattr(join, add)(page['data'])
+            yield from join.flush()
+        finally:
+            for pages, add in streams:
+                pages.close()
+
+
+class AsyncSentralClient(AsyncClient):
+    """
+    Same methods as SentralClient but they're coroutines. See utils/async_clients.py for how to use it.
+    """
+    client_class = SentralClient
@@ -0,0 +1,77 @@
+"""
+Joins Sentral persons with their person-phone and person-email records while the three lists are still being paged, so
+you can build a contact directory in one pass instead of three full downloads and a join at the end. Phones and emails
+are matched to their person on relationships.owner.data.id. See SentralClient.sync_contacts.
+
+Sentral doesn't return the lists in the same order, so a person's phones can turn up before or long after the person.
+Records wait in a join window until everything is in. Once more than window people are waiting, the one that has been
+quiet the longest is given to you early with 'partial' set. If more phones or emails for them turn up later they come
+out as another partial record, with 'person' set to None. Memory stays bounded by the window.
+
+"""
+
+from collections import OrderedDict
+
+
+def owner_id(record):
+    return record['relationships']['owner']['data']['id']
+
+
+class ContactJoin(object):
+
+    def __init__(self, window=10000):
+        """
+        :param window: How many people can be waiting for their records before we start handing them out early
+        """
+        self.window = window
+        self.pending = OrderedDict()
+        self.evicted = 0
+
+    def entry(self, person_id):
+        entry = self.pending.get(person_id)
+        if entry is None:
+            entry = self.pending[person_id] = {'id': person_id, 'person': None, 'phones': [], 'emails': [],
+                                               'partial': False}
+        else:
+            self.pending.move_to_end(person_id)
+        return entry
+
+    def add_persons(self, persons):
+        for person in persons:
+            if person['type'] == 'person':
+                self.entry(person['id'])['person'] = person
+        return self.evict()
+
+    def add_phones(self, phones):
+        for phone in phones:
+            self.entry(owner_id(phone))['phones'].append(phone)
+        return self.evict()
+
+    def add_emails(self, emails):
+        for email in emails:
+            self.entry(owner_id(email))['emails'].append(email)
+        return self.evict()
+
+    def evict(self):
+        """
+        :return: List of records pushed out of the window
+        """
+        evicted = []
+        while len(self.pending) > self.window:
+            entry = self.pending.popitem(last=False)[1]
+            entry['partial'] = True
+            evicted.append(entry)
+        self.evicted += len(evicted)
+        return evicted
+
+    def flush(self):
+        """
+        Call once every list has been paged through.
+        :return: List of every record still waiting. Records without a person are marked partial
+        """
+        records = list(self.pending.values())
+        self.pending.clear()
+        for entry in records:
+            if entry['person'] is None:
+                entry['partial'] = True
+        return records
@@ -0,0 +1,118 @@
+"""
+Index over the 'included' section of a Sentral JSON:API page. Sentral doesn't fold included resources into the records
+that point at them, so without this you'd scan 'included' for every relationship you want to follow. The index is
+built once per page and looks resources up by (type, id):
+
+index = IncludedIndex(response.get('included', []))
+for person in response['data']:
+    household = index.resolve(person, 'primaryHousehold')
+
+Siblings share households, so the same household comes back on page after page of a big sync. IdentityMap keeps
+included resources across pages, up to max_entries of the most recently used ones. Identical copies are swapped for the
+one we already have, so you can skip reprocessing them, and relationships resolve to resources from earlier pages:
+
+identity_map = IdentityMap()
+for response in client.iter_pages(client.person_url, params):
+    persons = client.get_persons(response, identity_map)
+
+"""
+
+from collections import OrderedDict
+
+
+def relationship_keys(resource, name):
+    """
+    :return: (type, id) for a to-one relationship, a list of them for a to-many one, or None if it's empty or missing
+    """
+    data = resource.get('relationships', {}).get(name, {}).get('data')
+    if isinstance(data, list):
+        return [(d['type'], d['id']) for d in data]
+    if data:
+        return data['type'], data['id']
+    return None
+
+
+class IncludedIndex(object):
+
+    def __init__(self, included=()):
+        self.resources = {}
+        for resource in included:
+            self.add(resource)
+
+    def add(self, resource):
+        return self.intern(resource)[0]
+
+    def intern(self, resource):
+        """
+        Adds resource unless we already have an identical copy.
+        :return: (the resource we keep, True if it's new or changed)
+        """
+        key = (resource['type'], resource['id'])
+        existing = self.resources.get(key)
+        if existing is not None and existing == resource:
+            return existing, False
+        self.resources[key] = resource
+        return resource, True
+
+    def get(self, type_, id_):
+        return self.resources.get((type_, id_))
+
+    def resolve(self, resource, name):
+        """
+        Follows one relationship of resource.
+        :return: The related resource for a to-one relationship or a list for a to-many one. Related resources that
+        weren't included are None for to-one and left out for to-many
+        """
+        keys = relationship_keys(resource, name)
+        if keys is None:
+            return None
+        if isinstance(keys, list):
+            related = [self.get(*key) for key in keys]
+            return [r for r in related if r is not None]
+        return self.get(*keys)
+
+    def hydrate(self, resource):
+        """
+        Returns a shallow copy of resource with every relationship resolved under 'related', e.g.
+        person['related']['primaryHousehold']['attributes']['name']. The original resource isn't changed.
+        """
+        related = {name: self.resolve(resource, name) for name in resource.get('relationships', {})}
+        return dict(resource, related=related)
+
+    def __iter__(self):
+        return iter(self.resources.values())
+
+    def __len__(self):
+        return len(self.resources)
+
+
+class IdentityMap(IncludedIndex):
+    """
+    IncludedIndex that lives for a whole sync. Least recently used resources are dropped once there are more than
+    max_entries, and a relationship pointing at one of those resolves to None like any resource that wasn't included.
+    """
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self.evicted = 0
+        super().__init__()
+        self.resources = OrderedDict()
+
+    def intern(self, resource):
+        key = (resource['type'], resource['id'])
+        existing = self.resources.get(key)
+        if existing is not None:
+            self.resources.move_to_end(key)
+            if existing == resource:
+                return existing, False
+        self.resources[key] = resource
+        if len(self.resources) > self.max_entries:
+            self.resources.popitem(last=False)
+            self.evicted += 1
+        return resource, True
+
+    def get(self, type_, id_):
+        resource = self.resources.get((type_, id_))
+        if resource is not None:
+            self.resources.move_to_end((type_, id_))
+        return resource
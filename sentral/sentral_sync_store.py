@@ -0,0 +1,76 @@
+"""
+Local SQLite store used by SentralClient.get_changes for incremental syncs. For every endpoint it keeps a watermark
+(when we last synced it) and a hash of every record we saw, so the next run can tell which records were created,
+updated or deleted without you having to compare anything yourself.
+
+store = SyncStore('sentral_sync.db')
+changes = client.get_changes(store, client.person_url)
+
+"""
+
+import hashlib
+import json
+import sqlite3
+
+
+def record_hash(record):
+    """
+    Hash of a record's content. Keys are sorted so the same record always gives the same hash.
+    """
+    data = json.dumps(record, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(data.encode('utf8')).hexdigest()
+
+
+class SyncStore(object):
+
+    def __init__(self, path='sentral_sync.db'):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS watermarks (endpoint TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS records (endpoint TEXT NOT NULL, record_id TEXT NOT NULL, "
+                "hash TEXT NOT NULL, PRIMARY KEY (endpoint, record_id))")
+
+    def get_watermark(self, endpoint):
+        row = self.conn.execute("SELECT value FROM watermarks WHERE endpoint = ?", (endpoint,)).fetchone()
+        return row[0] if row else None
+
+    def get_hashes(self, endpoint):
+        """
+        :return: Dict of record id to hash for everything we've seen on this endpoint
+        """
+        rows = self.conn.execute("SELECT record_id, hash FROM records WHERE endpoint = ?", (endpoint,))
+        return dict(rows)
+
+    def save(self, endpoint, hashes, deleted_ids, watermark):
+        """
+        Saves the result of a sync in one transaction so a failed run doesn't leave half the changes behind.
+        :param hashes: Dict of record id to hash for created and updated records
+        :param deleted_ids: Record ids that no longer exist
+        :param watermark: When this sync started
+        """
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO records (endpoint, record_id, hash) VALUES (?, ?, ?)",
+                ((endpoint, record_id, hash_) for record_id, hash_ in hashes.items()))
+            self.conn.executemany(
+                "DELETE FROM records WHERE endpoint = ? AND record_id = ?",
+                ((endpoint, record_id) for record_id in deleted_ids))
+            self.conn.execute(
+                "INSERT OR REPLACE INTO watermarks (endpoint, value) VALUES (?, ?)", (endpoint, watermark))
+
+    def reset(self, endpoint=None):
+        """
+        Forgets what we know about one endpoint, or all of them, so the next sync treats everything as new
+        """
+        with self.conn:
+            if endpoint:
+                self.conn.execute("DELETE FROM records WHERE endpoint = ?", (endpoint,))
+                self.conn.execute("DELETE FROM watermarks WHERE endpoint = ?", (endpoint,))
+            else:
+                self.conn.execute("DELETE FROM records")
+                self.conn.execute("DELETE FROM watermarks")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,53 @@
+"""
+Helpers for calling a per-student TASS method for a whole cohort. Calls run on a small thread pool and a token bucket
+keeps us under a requests per second limit, so run time depends on the concurrency and rate you pick rather than on
+how many students there are.
+
+client = TassLMSClient()
+pairs = client.iter_student_timetables(['1234', '1235'], max_workers=8, requests_per_second=10)
+write_ndjson(pairs, 'timetables.ndjson')
+
+"""
+
+import json
+
+from utils.concurrency import bounded_as_completed
+from utils.rate_limit import TokenBucket
+
+
+def iter_bulk(fetch, codes, max_workers=8, requests_per_second=10):
+    """
+    Calls fetch(code) for every student code and yields (code, payload) pairs as they come back. If a call fails the
+    payload is {'error': '<what went wrong>'} so one bad student doesn't stop the export.
+    :param fetch: Callable taking a student code and returning a requests Response
+    :param codes: Iterable of student codes
+    :param max_workers: How many requests to keep in flight
+    :param requests_per_second: Rate limit across all workers
+    :return: Generator of (code, payload) tuples in the order they finish
+    """
+    bucket = TokenBucket(requests_per_second)
+
+    def call(code):
+        bucket.acquire()
+        response = fetch(code)
+        response.raise_for_status()
+        return response.json()
+
+    for code, payload, error in bounded_as_completed(call, codes, max_workers=max_workers):
+        if error is not None:
+            payload = {'error': str(error)}
+        yield code, payload
+
+
+def write_ndjson(pairs, path):
+    """
+    Writes (code, payload) pairs to path, one JSON object per line, as they arrive.
+    :return: How many lines were written
+    """
+    count = 0
+    with open(path, 'w', encoding='utf8') as f:
+        for code, payload in pairs:
+            f.write(json.dumps({'code': code, 'payload': payload}))
+            f.write('\n')
+            count += 1
+    return count
@@ -18,60 +18,33 @@ tass_client = TassLMSClient()
 response = tass_client.get_student_subjects()
 """
 
-import base64
 import datetime
-from urllib.parse import urlencode
-from Crypto.Cipher import AES
-import requests
 
+from tass.tass_bulk import iter_bulk
+from tass.tass_signer import TassSigningMixin
+from utils.async_clients import AsyncClient
+from utils.session import SessionMixin, build_session
 
-class TassLMSClient(object):
-    def __init__(self):
-        self.token_key = ""
-        self.app_code = ""
-        self.company_code = ""
-        self.version = '3'
-        self.end_point = ""
-        self.headers = {'content-type': 'application/json'}
 
-    def get_encrypted_token(self, token, params):
-        decoded = base64.b64decode(token)
-        plaintext = params
-        length = 16 - (len(plaintext) % 16)
-        plaintext += chr(length) * length
-        rijndael = AES.new(decoded, AES.MODE_ECB)
-        ciphertext = rijndael.encrypt(plaintext.encode("utf8"))
-        ciphertext = base64.b64encode(ciphertext)
-        return ciphertext
-
-    def get_url_request(self, end_point, method, app_code, company_code, version, parameters, token_key):
-        encrypted = self.get_encrypted_token(token_key, parameters)
-        request_dict = {
-            "method": method,
-            "appcode": app_code,
-            "company": company_code,
-            "v": version,
-            "token": encrypted
-        }
-        request_str = urlencode(request_dict)
-        url_string = end_point + '?' + request_str
-        return url_string
-
-    def get_url(self, parameters, method, version):
+class TassLMSClient(TassSigningMixin, SessionMixin):
+    def __init__(self, token_key="", app_code="", company_code="", end_point=""):
         """
-        :param parameters: This needs to be a JSON as string.
-        :param method: This is not a HTTP method but the name of the function at TASS
-        :return: This and all the stuff above will just spit out a URL you make a request to.
+        Get these from the TASS API Gateway Maintenance screen. Pass them in when you sync more than one school
         """
-        return self.get_url_request(self.end_point, method, self.app_code, self.company_code, version, parameters,
-                                    self.token_key)
+        self.token_key = token_key
+        self.app_code = app_code
+        self.company_code = company_code
+        self.version = '3'
+        self.end_point = end_point
+        self.headers = {'content-type': 'application/json'}
+        self.session = build_session()
 
     def get_student_subjects(self, student_code='all'):
         params = "{'code': '%s'}" % student_code
         method = 'getStudentSubjects'
         version = '3'
         url = self.get_url(params, method, version)
-        response = requests.get(url)
+        response = self.session.get(url)
         return response
 
     def get_student_timetable(self, student_code):
@@ -79,5 +52,27 @@ class TassLMSClient(object):
         method = 'getStudentTimetable'
         version = '3'
         url = self.get_url(params, method, version)
-        response = requests.get(url)
-        return response
\ No newline at end of file
+        response = self.session.get(url)
+        return response
+
+    def iter_student_timetables(self, student_codes, max_workers=8, requests_per_second=10):
+        """
+        Fetches timetables for lots of students at once. See tass_bulk.py for details and write_ndjson for saving them.
+        :return: Generator of (student_code, timetable) tuples in the order they come back
+        """
+        yield from iter_bulk(self.get_student_timetable, student_codes, max_workers=max_workers,
+                              requests_per_second=requests_per_second)
+
+    def iter_student_subjects(self, student_codes, max_workers=8, requests_per_second=10):
+        """
+        Same as iter_student_timetables but for subjects
+        """
+        yield from iter_bulk(self.get_student_subjects, student_codes, max_workers=max_workers,
+                              requests_per_second=requests_per_second)
+
+
+class AsyncTassLMSClient(AsyncClient):
+    """
+    Same methods as TassLMSClient but they're coroutines. See utils/async_clients.py for how to use it.
+    """
+    client_class = TassLMSClient
@@ -0,0 +1,80 @@
+"""
+Builds the encrypted token and request URL that every TASS API call needs. All three TASS clients share this so the
+key is decoded and the AES cipher is built once per client instead of once per URL. Parameter strings we've already
+encrypted are cached, which helps when you generate thousands of per-student URLs.
+
+You need pycryptodome for this:
+
+pip install pycryptodome
+
+"""
+
+import base64
+from functools import lru_cache
+from urllib.parse import urlencode
+from Crypto.Cipher import AES
+
+
+def pkcs7_pad(data, block_size=16):
+    """
+    Pads bytes to a multiple of block_size the way TASS expects
+    """
+    length = block_size - (len(data) % block_size)
+    return data + bytes([length]) * length
+
+
+class TassRequestSigner(object):
+    """
+    Encrypts TASS parameter strings with one token key.
+    """
+
+    def __init__(self, token_key, cache_size=4096):
+        self.token_key = token_key
+        self.cipher = AES.new(base64.b64decode(token_key), AES.MODE_ECB)
+        self.encrypt = lru_cache(maxsize=cache_size)(self._encrypt)
+
+    def _encrypt(self, params):
+        """
+        :param params: Parameters as a JSON string
+        :return: Base64 encoded ciphertext as bytes
+        """
+        return base64.b64encode(self.cipher.encrypt(pkcs7_pad(params.encode('utf8'))))
+
+
+class TassSigningMixin(object):
+    """
+    URL building shared by the TASS clients. The class using it needs token_key, app_code, company_code and end_point
+    attributes.
+    """
+    _signer = None
+
+    def get_signer(self, token_key=None):
+        token_key = token_key or self.token_key
+        if self._signer is None or self._signer.token_key != token_key:
+            self._signer = TassRequestSigner(token_key)
+        return self._signer
+
+    def get_encrypted_token(self, token, params):
+        return self.get_signer(token).encrypt(params)
+
+    def get_url_request(self, end_point, method, app_code, company_code, version, parameters, token_key):
+        encrypted = self.get_encrypted_token(token_key, parameters)
+        request_dict = {
+            "method": method,
+            "appcode": app_code,
+            "company": company_code,
+            "v": version,
+            "token": encrypted
+        }
+        request_str = urlencode(request_dict)
+        url_string = end_point + '?' + request_str
+        return url_string
+
+    def get_url(self, parameters, method, version):
+        """
+        :param parameters: This needs to be a JSON as string.
+        :param method: This is not a HTTP method but the name of the function at TASS
+        :return: This and all the stuff above will just spit out a URL you make a request to.
+        """
+        return self.get_url_request(self.end_point, method, self.app_code, self.company_code, version, parameters,
+                                    self.token_key)
@@ -19,58 +19,104 @@ response = tass_client.get_current_students()
 for student in response.json()['students']:
     print(student)
 
+For big schools, especially when you want photos, stream the students instead. Only one student is held in memory at
+a time and photos can be written straight to disk:
+
+for student in tass_client.iter_current_students(include_photo=True, photo_dir='/tmp/photos'):
+    print(student)
+
 
 
 """
 
 import base64
+import codecs
 import datetime
-from urllib.parse import urlencode
-from Crypto.Cipher import AES
-import requests
-
-
-class TassClient(object):
-
-    def __init__(self):
-        self.token_key = ""
-        self.app_code = ""
-        self.company_code = ""
-        self.version = '3'
-        self.end_point = ""
-        self.headers = {'content-type': 'application/json'}
-
-    def get_encrypted_token(self, token, params):
-        decoded = base64.b64decode(token)
-        plaintext = params
-        length = 16 - (len(plaintext) % 16)
-        plaintext += chr(length) * length
-        rijndael = AES.new(decoded, AES.MODE_ECB)
-        ciphertext = rijndael.encrypt(plaintext.encode("utf8"))
-        ciphertext = base64.b64encode(ciphertext)
-        return ciphertext
-
-    def get_url_request(self, end_point, method, app_code, company_code, version, parameters, token_key):
-        encrypted = self.get_encrypted_token(token_key, parameters)
-        request_dict = {
-            "method": method,
-            "appcode": app_code,
-            "company": company_code,
-            "v": version,
-            "token": encrypted
-        }
-        request_str = urlencode(request_dict)
-        url_string = end_point + '?' + request_str
-        return url_string
-
-    def get_url(self, parameters, method, version):
+import json
+import os
+import re
+
+from tass.tass_bulk import iter_bulk
+from tass.tass_signer import TassSigningMixin
+from utils.async_clients import AsyncClient
+from utils.session import SessionMixin, build_session
+
+_json_decoder = json.JSONDecoder()
+
+
+def iter_json_array(chunks, key):
+    """
+    Yields the elements of the array stored under key in a JSON response, one at a time, as the body comes in. Only the
+    element being parsed is kept in memory so this works no matter how big the array is.
+    :param chunks: Iterable of bytes e.g. response.iter_content(65536)
+    :param key: Name of the array e.g. 'students'
+    :return: Generator of decoded elements. Raises ValueError if the body has no such array or ends part way through it,
+    so an error body never looks like an empty list
+    """
+    decode = codecs.getincrementaldecoder('utf-8')().decode
+    array_start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    chunks = iter(chunks)
+    buffer = ''
+    for chunk in chunks:
+        buffer += decode(chunk)
+        match = array_start.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        # Keep a little bit of the tail in case the key is split across two chunks
+        buffer = buffer[-(len(key) + 64):]
+    else:
+        raise ValueError("Response ended without a %s array" % key)
+
+    pos = 0
+    finished = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+        if pos < len(buffer):
+            if buffer[pos] == ']':
+                return
+            try:
+                item, end = _json_decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if finished:
+                    raise
+            else:
+                # Numbers and literals can be cut off anywhere (2 of 2.5), so a value is only complete once we can see
+                # the whitespace, comma or ] after it
+                if end < len(buffer) and buffer[end] in ' \t\r\n,]':
+                    yield item
+                    pos = end
+                    continue
+                if finished and end < len(buffer):
+                    raise ValueError("Unexpected data after an element of the %s array" % key)
+                if finished:
+                    raise ValueError("Response ended before the end of the %s array" % key)
+        elif finished:
+            raise ValueError("Response ended before the end of the %s array" % key)
+        chunk = next(chunks, None)
+        if chunk is None:
+            finished = True
+            buffer = buffer[pos:] + decode(b'', final=True)
+        else:
+            buffer = buffer[pos:] + decode(chunk)
+        pos = 0
+
+
+class TassClient(TassSigningMixin, SessionMixin):
+
+    def __init__(self, token_key="", app_code="", company_code="", end_point=""):
         """
-        :param parameters: This needs to be a JSON as string.
-        :param method: This is not a HTTP method but the name of the function at TASS
-        :return: This and all the stuff above will just spit out a URL you make a request to.
+        Get these from the TASS API Gateway Maintenance screen. Pass them in when you sync more than one school
         """
-        return self.get_url_request(self.end_point, method, self.app_code, self.company_code, version, parameters,
-                                    self.token_key)
+        self.token_key = token_key
+        self.app_code = app_code
+        self.company_code = company_code
+        self.version = '3'
+        self.end_point = end_point
+        self.headers = {'content-type': 'application/json'}
+        self.session = build_session()
+        self.photo_field = 'photo'  # Key TASS returns the base64 student photo under when includephoto is true
 
     def get_current_student_with_code(self, student_code):
         """
@@ -80,7 +126,7 @@ class TassClient(object):
         method = 'getStudentsDetails'
         version = '3'
         url = self.get_url(params, method, version)
-        response = requests.get(url)
+        response = self.session.get(url)
         return response
 
     def get_current_students(self):
@@ -91,9 +137,46 @@ class TassClient(object):
         method = 'getStudentsDetails'
         version = '3'
         url = self.get_url(params, method, version)
-        response = requests.get(url)
+        response = self.session.get(url)
         return response
 
+    def iter_current_students(self, include_photo=False, photo_dir=None, chunk_size=65536):
+        """
+        Same call as get_current_students but the response is streamed and students are parsed one at a time, so memory
+        stays flat however big the school is.
+        :param include_photo: Ask TASS to include each student's photo
+        :param photo_dir: If set, photos are decoded and saved here as <student code>.jpg and the photo in the student
+        dict is replaced with the file path. Students without a code keep the base64 photo
+        :param chunk_size: How many bytes to read from the response at a time
+        :return: Generator of student dicts
+        """
+        if include_photo:
+            params = "{'currentstatus': 'current', 'includephoto': true}"
+        else:
+            params = "{'currentstatus': 'current'}"
+        method = 'getStudentsDetails'
+        version = '3'
+        url = self.get_url(params, method, version)
+        with self.session.get(url, stream=True) as response:
+            response.raise_for_status()
+            for student in iter_json_array(response.iter_content(chunk_size), 'students'):
+                if photo_dir and student.get(self.photo_field) and student.get('code'):
+                    student[self.photo_field] = self.save_photo(student, photo_dir)
+                yield student
+
+    def save_photo(self, student, photo_dir):
+        """
+        Writes the student's base64 photo to photo_dir as <student code>.jpg and returns the file path. Anything other
+        than letters, digits, '-' and '_' in the code is replaced so the file always ends up in photo_dir
+        """
+        code = re.sub(r'[^\w-]', '_', str(student.get('code') or ''), flags=re.ASCII)
+        if not code:
+            raise ValueError("Can't save a photo for a student without a code")
+        path = os.path.join(photo_dir, '%s.jpg' % code)
+        with open(path, 'wb') as f:
+            f.write(base64.b64decode(student[self.photo_field]))
+        return path
+
     def get_current_parents(self):
         """
         See tass_playground.txt for details
@@ -102,7 +185,7 @@ class TassClient(object):
         method = 'getCommunicationRulesDetails'
         version = '3'
         url = self.get_url(params, method, version)
-        response = requests.get(url)
+        response = self.session.get(url)
         return response
 
     def get_parents_for_student_code(self, student_code):
@@ -110,19 +193,20 @@ class TassClient(object):
         method = 'getCommunicationRulesDetails'
         version = '3'
         url = self.get_url(params, method, version)
-        response = requests.get(url)
+        response = self.session.get(url)
         return response
 
+    def iter_parents_for_student_codes(self, student_codes, max_workers=8, requests_per_second=10):
+        """
+        Fetches parents for lots of students at once. See tass_bulk.py for details.
+        :return: Generator of (student_code, parents) tuples in the order they come back
+        """
+        yield from iter_bulk(self.get_parents_for_student_code, student_codes, max_workers=max_workers,
+                              requests_per_second=requests_per_second)
 
 
-
-
-
-
-
-
-
-
-
-
-
+class AsyncTassClient(AsyncClient):
+    """
+    Same methods as TassClient but they're coroutines. See utils/async_clients.py for how to use it.
+    """
+    client_class = TassClient
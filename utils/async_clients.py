@@ -0,0 +1,124 @@
+"""
+Async versions of the clients in this repo. Every AsyncXxxClient has the same methods as XxxClient, except they are
+coroutines you await. Generator methods like SentralClient.iter_pages become async generators. Methods that hand back
+a blocking iterator, like paginate, aren't available on the async clients, use the iter_* generators instead.
+
+Under the hood each call runs the normal blocking client method on a shared thread pool, and every client session
+gets the same keep-alive connection pool mounted on it. That means one event loop can drive lots of schools at once
+while the number of threads and open connections stays bounded:
+
+import asyncio
+from sentral.sentral_client import AsyncSentralClient
+from tass.tass_student_client import AsyncTassClient
+
+async def main():
+    sentral = await AsyncSentralClient.create()
+    tass = await AsyncTassClient.create()
+    await asyncio.gather(sentral.get_all(), tass.get_current_students())
+
+asyncio.run(main())
+
+"""
+
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.transport import ResilientAdapter
+
+
+class SharedPool(object):
+    """
+    A bounded pool of worker threads and keep-alive HTTP connections shared by every async client on the event loop.
+    max_workers caps how many API calls run at once across all clients. pool_connections is how many hosts we keep
+    connections open to and pool_maxsize is how many connections we keep per host. Rate limits and retries are shared
+    the same way, see transport.py.
+    """
+
+    def __init__(self, max_workers=32, pool_connections=100, pool_maxsize=10):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sis-client')
+        self.adapter = ResilientAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+    def mount(self, session):
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        self.executor.shutdown()
+        self.adapter.close()
+
+
+_default_pool = None
+
+
+def get_default_pool():
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = SharedPool()
+    return _default_pool
+
+
+_done = object()
+
+
+class AsyncClient(object):
+    """
+    Base class for the async clients. Subclasses only need to set client_class.
+    """
+    client_class = None
+    sync_only = ('paginate',)  # Return blocking iterators that would run on the event loop thread
+
+    def __init__(self, client=None, pool=None):
+        self.pool = pool or get_default_pool()
+        self.client = client if client is not None else self.client_class()
+        session = getattr(self.client, 'session', None)
+        if session is not None:
+            self.pool.mount(session)
+
+    @classmethod
+    async def create(cls, *args, pool=None, **kwargs):
+        """
+        Builds the underlying client on the pool. Use this instead of the constructor inside a running event loop since
+        some clients authenticate in their __init__.
+        """
+        pool = pool or get_default_pool()
+        client = await pool.run(cls.client_class, *args, **kwargs)
+        return cls(client, pool=pool)
+
+    def __getattr__(self, name):
+        if name in self.sync_only:
+            raise AttributeError("%s.%s returns a blocking iterator, use an iter_* method instead" % (
+                type(self).__name__, name))
+        attr = getattr(self.client, name)
+        if not callable(attr):
+            return attr
+        if inspect.isgeneratorfunction(attr):
+            return self._wrap_generator(attr)
+        return self._wrap_method(attr)
+
+    def _wrap_method(self, method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            return await self.pool.run(method, *args, **kwargs)
+        return wrapper
+
+    def _wrap_generator(self, method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            gen = method(*args, **kwargs)
+            try:
+                while True:
+                    # Each step of the generator can hit the network so it runs on the pool as well
+                    item = await self.pool.run(next, gen, _done)
+                    if item is _done:
+                        return
+                    yield item
+            finally:
+                if not gen.gi_running:
+                    gen.close()
+        return wrapper
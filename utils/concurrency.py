@@ -0,0 +1,75 @@
+"""
+Small helpers for running blocking API calls on a thread pool. Python requests releases the GIL while it's waiting on
+the network, so a handful of threads is all you need to keep several requests in flight at once.
+
+These live outside the school system folders because more than one client uses them. Run your scripts from the root
+of this repo (e.g. python -m sentral.sentral_client) or add the root to your PYTHONPATH so the imports resolve.
+
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def ordered_prefetch(func, items, max_workers=4):
+    """
+    Calls func(item) for every item using up to max_workers threads and yields the results in the same order as items.
+    Only max_workers calls are in flight at any time, so items can be an endless iterator like itertools.count(). Once
+    you stop iterating, calls that haven't started yet are cancelled.
+    :param func: Callable that takes one item
+    :param items: Iterable of items to pass to func
+    :param max_workers: How many calls can run at the same time
+    :return: Generator of func results in order
+    """
+    items = iter(items)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= max_workers:
+                break
+        while pending:
+            result = pending.popleft().result()
+            # Top up the window before handing the result back so the next call is already running while the caller
+            # works on this one
+            for item in items:
+                pending.append(executor.submit(func, item))
+                break
+            yield result
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def bounded_as_completed(func, items, max_workers=8):
+    """
+    Calls func(item) for every item using up to max_workers threads and yields (item, result, error) tuples as each
+    call finishes. A failed call doesn't stop the others, you just get the exception back as error and result is None.
+    Like ordered_prefetch, items can be a lazy iterator since only max_workers calls are in flight at once.
+    :param func: Callable that takes one item
+    :param items: Iterable of items to pass to func
+    :param max_workers: How many calls can run at the same time
+    :return: Generator of (item, result, error) tuples in the order the calls finish
+    """
+    items = iter(items)
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = {}
+    try:
+        for item in items:
+            pending[executor.submit(func, item)] = item
+            if len(pending) >= max_workers:
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                for next_item in items:
+                    pending[executor.submit(func, next_item)] = next_item
+                    break
+                error = future.exception()
+                if error is None:
+                    yield item, future.result(), None
+                else:
+                    yield item, None, error
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
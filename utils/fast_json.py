@@ -0,0 +1,30 @@
+"""
+json_loads decodes with orjson or msgspec when one of them is installed and falls back to the standard json module.
+Both are a lot quicker on big pages. Install one with:
+
+pip install orjson
+
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+if orjson is not None:
+    json_loads = orjson.loads
+    backend = 'orjson'
+elif msgspec is not None:
+    json_loads = msgspec.json.decode
+    backend = 'msgspec'
+else:
+    json_loads = json.loads
+    backend = 'json'
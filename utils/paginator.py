@@ -0,0 +1,107 @@
+"""
+One paginator for the APIs that return a page of records plus a link to the next page (Sentral, Edumate). Each page is
+fetched and decoded exactly once. You can iterate over the pages or straight over the records:
+
+paginator = Paginator(get_page, first_url, next_url=lambda page: page['links'].get('next'))
+for record in paginator:
+    print(record)
+print(paginator.page_count, paginator.record_count)
+
+With prefetch the next pages are fetched on a background thread while you're working on the current one. If you can
+work out every page URL up front, e.g. by offset, pass page_urls instead of url and prefetch + 1 pages are fetched at
+the same time.
+
+"""
+
+import queue
+import threading
+
+from utils.concurrency import ordered_prefetch
+
+_done = object()
+
+
+class Paginator(object):
+
+    def __init__(self, get_page, url=None, next_url=None, records=None, prefetch=0, page_urls=None):
+        """
+        :param get_page: Callable taking a URL and returning the decoded page
+        :param url: URL of the first page. We keep following next_url from there
+        :param next_url: Callable taking a decoded page and returning the URL of the next page, or None on the last one
+        :param records: Callable taking a decoded page and returning its records. Defaults to page['data']
+        :param prefetch: How many pages to fetch ahead of the one you're working on
+        :param page_urls: Iterable of every page URL, used instead of url. We stop at the first page next_url returns
+        None for
+        """
+        self.get_page = get_page
+        self.url = url
+        self.next_url = next_url
+        self.records = records or (lambda page: page['data'])
+        self.prefetch = prefetch
+        self.page_urls = page_urls
+        self.page_count = 0
+        self.record_count = 0
+
+    def pages(self):
+        if self.page_urls is not None:
+            source = self._fetch_page_urls()
+        elif self.prefetch:
+            source = self._prefetch_links()
+        else:
+            source = self._follow_links()
+        for page in source:
+            self.page_count += 1
+            self.record_count += len(self.records(page))
+            yield page
+
+    def __iter__(self):
+        for page in self.pages():
+            yield from self.records(page)
+
+    def _follow_links(self):
+        url = self.url
+        while url:
+            page = self.get_page(url)
+            yield page
+            url = self.next_url(page)
+
+    def _fetch_page_urls(self):
+        for page in ordered_prefetch(self.get_page, self.page_urls, max_workers=self.prefetch + 1):
+            yield page
+            if not self.next_url(page):
+                return
+
+    def _prefetch_links(self):
+        pages = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for page in self._follow_links():
+                    if not put((page, None)):
+                        return
+                put((_done, None))
+            except Exception as e:
+                put((None, e))
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                page, error = pages.get()
+                if error is not None:
+                    raise error
+                if page is _done:
+                    return
+                yield page
+        finally:
+            # Lets the background thread finish if you stop iterating early
+            stop.set()
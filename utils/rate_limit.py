@@ -0,0 +1,105 @@
+"""
+A simple thread safe token bucket for keeping request rates under what a school system is happy to take.
+
+bucket = TokenBucket(rate=10)  # 10 requests a second on average
+bucket.acquire()  # Blocks until we're allowed to send the next request
+
+AdaptiveRateLimiter wraps a bucket and finds the fastest rate a server is happy with. It doesn't hold anything back
+until the server first tells us to slow down. From then on it speeds up a little after every successful request and
+halves the rate whenever the server throttles us again.
+
+"""
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    rate tokens are added every second, up to capacity. Each request takes one. capacity is how big a burst we allow
+    and defaults to one second's worth of tokens.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, tokens=1):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def set_rate(self, rate):
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+
+    def pause(self, seconds):
+        """
+        Nobody gets a token for the next seconds. Used when a server sends Retry-After.
+        """
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class AdaptiveRateLimiter(object):
+    """
+    Additive increase, multiplicative decrease on top of a TokenBucket, the same way TCP finds how fast it can send.
+    Requests go out as fast as they're made until the first throttle, which sets the rate to rate. After that each
+    success adds increase requests a second spread over a second's worth of requests, so the rate grows by about
+    increase every second while things are fine. A throttle multiplies it by decrease, at most once every cooldown
+    seconds so a burst of 429s from requests that were already in flight only counts once.
+    """
+
+    def __init__(self, rate=10, min_rate=0.5, max_rate=100, increase=1, decrease=0.5, cooldown=1):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.decreased = 0
+        self.limited = False  # Set on the first throttle, until then we don't hold requests back
+        self.bucket = TokenBucket(rate)
+
+    @property
+    def rate(self):
+        return self.bucket.rate if self.limited else None
+
+    def acquire(self):
+        if self.limited:
+            self.bucket.acquire()
+
+    def on_success(self):
+        if not self.limited:
+            return
+        rate = self.bucket.rate
+        if rate < self.max_rate:
+            self.bucket.set_rate(min(self.max_rate, rate + self.increase / rate))
+
+    def on_throttle(self, retry_after=None):
+        """
+        :param retry_after: Seconds nobody gets a token for. Only pass it when we're going to wait that long anyway
+        """
+        now = time.monotonic()
+        if not self.limited:
+            self.limited = True
+            self.decreased = now
+        elif now - self.decreased >= self.cooldown:
+            self.decreased = now
+            self.bucket.set_rate(max(self.min_rate, self.bucket.rate * self.decrease))
+        if retry_after:
+            self.bucket.pause(retry_after)
@@ -0,0 +1,149 @@
+"""
+Cache for API responses that hardly ever change, like houses, years or nationality lookups. Responses are kept in a
+small in-memory LRU and, if you give it a path, in a SQLite file so they survive between runs. Within the TTL a cached
+response is returned without touching the network.
+
+Once an entry expires we ask the server again, but if the old response had an ETag or Last-Modified header we send
+If-None-Match / If-Modified-Since. If the server says 304 Not Modified we keep using what we had.
+
+cache = ResponseCache(ttl=24 * 60 * 60, path='lookups.db')
+response = cache.fetch('houses', lambda headers: session.get(houses_url, headers=headers))
+cache.invalidate('houses')  # or cache.invalidate() to drop everything
+
+Only the status code, the validator and content type headers and the body are kept, never the request that fetched
+them, so API keys and signed bodies don't end up in the cache file.
+
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+
+KEPT_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+
+def strip_response(response):
+    """
+    Copies the parts of a response worth caching into a bare Response with no request attached
+    """
+    headers = {name: response.headers[name] for name in KEPT_HEADERS if response.headers.get(name)}
+    return build_response(response.status_code, headers, response.content, response.url)
+
+
+def build_response(status_code, headers, content, url=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers)
+    response._content = content
+    response.url = url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+class ResponseCache(object):
+
+    def __init__(self, ttl=24 * 60 * 60, max_entries=256, path=None):
+        """
+        :param ttl: Seconds a response is used without asking the server again
+        :param max_entries: How many responses to keep in memory
+        :param path: Optional SQLite file to keep responses between runs
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory = OrderedDict()  # key -> (expires_at, bare response)
+        self.lock = threading.Lock()
+        self.conn = None
+        if path:
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            with self.conn:
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires_at REAL, "
+                    "status_code INTEGER, headers TEXT, content BLOB, url TEXT)")
+
+    def get(self, key):
+        """
+        :return: (expires_at, response) or None if we've never seen key
+        """
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                return entry
+            if self.conn is None:
+                return None
+            row = self.conn.execute(
+                "SELECT expires_at, status_code, headers, content, url FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            if row is None:
+                return None
+            entry = (row[0], build_response(row[1], json.loads(row[2]), bytes(row[3]), row[4]))
+            self._remember(key, entry)
+            return entry
+
+    def set(self, key, response):
+        """
+        :return: The bare copy of response that was cached
+        """
+        response = strip_response(response)
+        entry = (time.time() + self.ttl, response)
+        with self.lock:
+            self._remember(key, entry)
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT OR REPLACE INTO responses (key, expires_at, status_code, headers, content, url) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, entry[0], response.status_code, json.dumps(dict(response.headers)),
+                         response.content, response.url))
+        return response
+
+    def _remember(self, key, entry):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """
+        Drops one cached response, or everything if key isn't given
+        """
+        with self.lock:
+            if key is None:
+                self.memory.clear()
+            else:
+                self.memory.pop(key, None)
+            if self.conn is not None:
+                with self.conn:
+                    if key is None:
+                        self.conn.execute("DELETE FROM responses")
+                    else:
+                        self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+    def fetch(self, key, send):
+        """
+        Returns the cached response for key while it's fresh. Otherwise calls send(headers) to get a new one, passing
+        conditional headers if the old response had validators.
+        :param key: Cache key, usually the URL plus anything that changes the response
+        :param send: Callable taking a dict of extra headers and returning a requests Response
+        :return: requests Response
+        """
+        entry = self.get(key)
+        headers = {}
+        if entry is not None:
+            expires_at, cached = entry
+            if time.time() < expires_at:
+                return cached
+            if cached.headers.get('ETag'):
+                headers['If-None-Match'] = cached.headers['ETag']
+            if cached.headers.get('Last-Modified'):
+                headers['If-Modified-Since'] = cached.headers['Last-Modified']
+        response = send(headers)
+        if response.status_code == 304 and entry is not None:
+            response = entry[1]
+        elif not response.ok:
+            return response
+        return self.set(key, response)
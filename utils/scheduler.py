@@ -0,0 +1,183 @@
+"""
+Runs the nightly sync for lots of schools at once from one process. Give it a Tenant per school, whatever SIS they're
+on, and it builds each client with that school's settings and runs its sync on a thread pool:
+
+tenants = [
+    Tenant('st-marys', SentralClient, 'get_all', settings={'school_sentral_url': 'https://sentral.stmarys.nsw.edu.au',
+                                                          'sentral_key': '...', 'sentral_tenant_id': '...'}),
+    Tenant('kings', TassClient, 'get_current_students', settings={'token_key': '...', 'app_code': '...',
+                                                                  'company_code': '...', 'end_point': '...'},
+           host='tass-cloud', deadline=datetime.datetime(2026, 10, 19, 5, 0), expected=1800),
+]
+results = SyncScheduler(max_workers=16, per_host=4).run(tenants)
+for result in results:
+    print(result.name, result.wait, result.duration, result.late, result.error)
+
+max_workers caps how many syncs run at once in total and per_host caps how many run against one host, so a hosted SIS
+that serves lots of schools doesn't get all of them at the same time. A tenant's host comes from the URL in its
+settings, so schools hosting their own Sentral or Edumate don't share a cap, or from the client class for shared
+cloud systems. When a slot frees up we start the tenant with the least slack, i.e. the one that will be late soonest
+given its deadline and how long it usually takes. Tenants without a deadline are shared fairly between hosts, going
+to the host that's had the least sync time so far.
+
+Each client's session already rate limits and retries per tenant, see transport.py.
+
+"""
+
+import datetime
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+# Client settings holding the URL a school's system sits on, used to work out the host
+URL_SETTINGS = ('school_sentral_url', 'edumate_url', 'end_point', 'base_url', 'engage_url')
+
+
+def settings_host(settings):
+    """
+    :return: Host name from the first URL setting that has one, or None
+    """
+    for name in URL_SETTINGS:
+        host = urlparse(settings.get(name) or '').netloc
+        if host:
+            return host.lower()
+    return None
+
+
+class Tenant(object):
+
+    def __init__(self, name, client_class, job, settings=None, host=None, deadline=None, expected=0):
+        """
+        :param name: Name for the school, used in the results
+        :param client_class: Client to build, e.g. SentralClient
+        :param job: Name of the client method to run, or a callable taking the client
+        :param settings: Keyword arguments for client_class, i.e. this school's URL and credentials
+        :param host: Key for the per host cap. Defaults to the host of the URL in settings, e.g. school_sentral_url or
+        edumate_url, so self-hosted schools don't hold each other up. Without a URL setting it's the client class name,
+        so every school on a shared cloud system counts against one host
+        :param deadline: When the sync has to be done by, as a datetime or seconds after the scheduler starts
+        :param expected: How many seconds the sync usually takes. Use last night's TenantResult.duration
+        """
+        self.name = name
+        self.client_class = client_class
+        self.job = job
+        self.settings = settings or {}
+        self.host = host or settings_host(self.settings) or client_class.__name__
+        self.deadline = deadline
+        self.expected = expected
+
+    def run(self):
+        client = self.client_class(**self.settings)
+        try:
+            if callable(self.job):
+                return self.job(client)
+            return getattr(client, self.job)()
+        finally:
+            close = getattr(client, 'close', None)
+            if close:
+                close()
+
+
+class TenantResult(object):
+    """
+    Timing and outcome of one tenant's sync. Times are time.time() values. error is the exception if the sync failed.
+    """
+
+    def __init__(self, tenant, queued, deadline):
+        self.tenant = tenant
+        self.name = tenant.name
+        self.host = tenant.host
+        self.queued = queued
+        self.deadline = deadline
+        self.started = None
+        self.finished = None
+        self.result = None
+        self.error = None
+
+    @property
+    def wait(self):
+        """
+        Seconds between the scheduler starting and this sync starting
+        """
+        return self.started - self.queued if self.started else None
+
+    @property
+    def duration(self):
+        return self.finished - self.started if self.finished else None
+
+    @property
+    def late(self):
+        return self.deadline is not None and self.finished is not None and self.finished > self.deadline
+
+
+class SyncScheduler(object):
+
+    def __init__(self, max_workers=16, per_host=4):
+        if max_workers < 1 or per_host < 1:
+            raise ValueError("max_workers and per_host need to be at least 1")
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.lock = threading.Lock()
+        self.results = []  # TenantResults of the current or last run, in the order the syncs finished
+
+    def deadline_time(self, tenant, started):
+        if tenant.deadline is None:
+            return None
+        if isinstance(tenant.deadline, datetime.datetime):
+            return tenant.deadline.timestamp()
+        return started + tenant.deadline
+
+    def priority(self, result, now, running, busy):
+        """
+        Sort key for tenants waiting to start. Lowest goes first: least slack, then the host with the fewest running
+        syncs and least sync time so far, then the order they were given in.
+        """
+        if result.deadline is None:
+            slack = float('inf')
+        else:
+            slack = result.deadline - now - result.tenant.expected
+        return slack, running.get(result.host, 0), busy.get(result.host, 0.0)
+
+    def run(self, tenants):
+        """
+        Runs every tenant's sync and waits for them all. A failing sync doesn't stop the others, its exception ends up
+        in its TenantResult.
+        :param tenants: Iterable of Tenant
+        :return: List of TenantResult in the order the syncs finished
+        """
+        started = time.time()
+        waiting = [TenantResult(tenant, started, self.deadline_time(tenant, started)) for tenant in tenants]
+        running = {}  # host -> number of syncs running
+        busy = {}  # host -> seconds of finished syncs
+        in_flight = {}
+        self.results = []
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='sis-sync') as executor:
+            while waiting or in_flight:
+                now = time.time()
+                while len(in_flight) < self.max_workers:
+                    # Starting a sync changes the fair share for its host, so pick again each time
+                    ready = [r for r in waiting if running.get(r.host, 0) < self.per_host]
+                    if not ready:
+                        break
+                    result = min(ready, key=lambda r: self.priority(r, now, running, busy))
+                    waiting.remove(result)
+                    running[result.host] = running.get(result.host, 0) + 1
+                    in_flight[executor.submit(self._run, result)] = result
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = in_flight.pop(future)
+                    running[result.host] -= 1
+                    busy[result.host] = busy.get(result.host, 0.0) + result.duration
+        return self.results
+
+    def _run(self, result):
+        result.started = time.time()
+        try:
+            result.result = result.tenant.run()
+        except Exception as e:
+            result.error = e
+        result.finished = time.time()
+        with self.lock:
+            self.results.append(result)
+        return result
@@ -0,0 +1,47 @@
+"""
+Every client talks to its school system through one pooled requests Session so connections are kept alive and reused
+instead of doing a new TCP and TLS handshake for every call. The pool is a ResilientAdapter, which also rate limits
+each tenant and retries 429s and transient errors. See transport.py.
+
+requests only speaks HTTP/1.1. Keep-alive gets you most of what HTTP/2 would for these APIs since we make lots of small
+calls to one host.
+
+"""
+
+import requests
+
+from utils.transport import ResilientAdapter
+
+
+def build_session(pool_connections=4, pool_maxsize=16, **transport):
+    """
+    Returns a requests Session with a keep-alive connection pool.
+    :param pool_connections: How many hosts to keep connection pools for
+    :param pool_maxsize: How many connections to keep open per host. Set this to at least the number of threads that
+    share the session
+    :param transport: Rate limit and retry settings for ResilientAdapter, e.g. rate=5 or retries=0
+    :return: requests.Session
+    """
+    session = requests.Session()
+    adapter = ResilientAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, **transport)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class SessionMixin(object):
+    """
+    Lets you use a client with a session attribute as a context manager so its connections get closed when you're done:
+
+    with TassClient() as client:
+        client.get_current_students()
+    """
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
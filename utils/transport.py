@@ -0,0 +1,178 @@
+"""
+A requests transport adapter that keeps us under a school system's rate limits and gets through the odd transient
+error instead of dying halfway through a 40 page sync. build_session mounts it on every client's session, so you don't
+need to do anything to use it.
+
+- Requests to each tenant go through an AdaptiveRateLimiter. Nothing is held back until the server sends 429 or
+  Retry-After, then we drop to rate requests a second, speed up while the server is happy and back off again on the
+  next 429.
+- 429, 502, 503 and 504 responses, connection errors and timeouts are retried with jittered exponential backoff, or
+  after Retry-After when the server sends it.
+- Retries come out of a budget that refills as a share of normal requests, so when a server is properly down we stop
+  retrying instead of piling on.
+
+Requests that aren't safe to send twice, like POST, are only retried on 429 and connection failures, where the server
+never got to process them.
+
+You can tune it by mounting your own:
+
+adapter = ResilientAdapter(rate=5, max_rate=20, retries=6)
+client.session.mount('https://', adapter)
+
+"""
+
+import email.utils
+import random
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ConnectTimeout, ReadTimeout
+from urllib3.exceptions import NewConnectionError
+
+from utils.rate_limit import AdaptiveRateLimiter
+
+
+def parse_retry_after(value):
+    """
+    :return: Seconds to wait from a Retry-After header, which is either a number of seconds or an HTTP date. None if
+    there isn't one we can read
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def never_sent(error):
+    """
+    True if a connection error happened before the request got to the server, so it's safe to send it again whatever
+    the method
+    """
+    if isinstance(error, ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class RetryBudget(object):
+    """
+    Every request puts ratio of a retry into the budget and every retry takes one out. The budget starts with, and never
+    holds more than, max_balance retries.
+    """
+
+    def __init__(self, ratio=0.2, max_balance=20):
+        self.ratio = ratio
+        self.max_balance = max_balance
+        self.balance = float(max_balance)
+        self.lock = threading.Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.balance = min(self.max_balance, self.balance + self.ratio)
+
+    def withdraw(self):
+        """
+        :return: True if there was a retry left in the budget
+        """
+        with self.lock:
+            if self.balance < 1:
+                return False
+            self.balance -= 1
+            return True
+
+
+class ResilientAdapter(HTTPAdapter):
+
+    def __init__(self, rate=20, min_rate=0.5, max_rate=100, retries=4, backoff=0.5, max_backoff=30,
+                 max_retry_after=120, budget=None, retry_statuses=(429, 502, 503, 504),
+                 idempotent_methods=('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'), **kwargs):
+        """
+        :param rate: Requests a second a tenant drops to the first time it throttles us
+        :param min_rate: Slowest we'll go after being throttled
+        :param max_rate: Fastest we'll go once a tenant has throttled us
+        :param retries: How many times to retry one request
+        :param backoff: First backoff in seconds. It doubles on every retry, up to max_backoff, and we wait a random
+        time up to that
+        :param max_retry_after: If the server wants us to wait longer than this, give up and return its response
+        :param budget: RetryBudget. Each adapter gets its own by default
+        :param retry_statuses: Status codes worth retrying
+        :param idempotent_methods: Methods we can retry after the server may already have processed the request
+        :param kwargs: Passed on to HTTPAdapter, e.g. pool_connections and pool_maxsize
+        """
+        super().__init__(**kwargs)
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.budget = budget or RetryBudget()
+        self.retry_statuses = retry_statuses
+        self.idempotent_methods = idempotent_methods
+        self.limiters = {}
+        self.limiters_lock = threading.Lock()
+
+    def tenant_key(self, request):
+        """
+        Requests with the same key share a rate limiter. Sentral can serve several tenants from one host, so we look
+        at its tenant header as well as the host.
+        """
+        host = request.url.split('/')[2] if '://' in request.url else request.url
+        return host, request.headers.get('X-API-TENANT')
+
+    def get_limiter(self, request):
+        key = self.tenant_key(request)
+        with self.limiters_lock:
+            limiter = self.limiters.get(key)
+            if limiter is None:
+                limiter = self.limiters[key] = AdaptiveRateLimiter(self.rate, self.min_rate, self.max_rate)
+            return limiter
+
+    def backoff_delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def can_retry(self, attempt):
+        return attempt < self.retries and self.budget.withdraw()
+
+    def send(self, request, **kwargs):
+        limiter = self.get_limiter(request)
+        idempotent = request.method in self.idempotent_methods
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            limiter.acquire()
+            try:
+                response = super().send(request, **kwargs)
+            except (ConnectionError, ReadTimeout) as e:
+                if not (idempotent or never_sent(e)) or not self.can_retry(attempt):
+                    raise
+                delay = self.backoff_delay(attempt)
+            else:
+                status = response.status_code
+                if status not in self.retry_statuses:
+                    limiter.on_success()
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                retrying = ((retry_after is None or retry_after <= self.max_retry_after)
+                            and (idempotent or status == 429) and self.can_retry(attempt))
+                if status == 429 or retry_after is not None:
+                    # Only pause the tenant for Retry-After when we're waiting it out ourselves. Otherwise a long
+                    # Retry-After we give up on would freeze every other request to the tenant for that long
+                    limiter.on_throttle(retry_after if retrying else None)
+                if not retrying:
+                    return response
+                response.close()
+                # The limiter is already paused for Retry-After, the backoff is on top of that
+                delay = 0 if retry_after is not None else self.backoff_delay(attempt)
+            if delay:
+                time.sleep(delay)
+            attempt += 1